@@ -67,6 +67,7 @@ CREATE TABLE IF NOT EXISTS video_summary (
 CREATE_INDEXES = [
     "CREATE INDEX IF NOT EXISTS idx_{table}_author_mid ON {table} (author_mid);",
     "CREATE INDEX IF NOT EXISTS idx_{table}_view_at ON {table} (view_at);",
+    "CREATE INDEX IF NOT EXISTS idx_{table}_view_duration ON {table} (view_at, duration);",
     "CREATE INDEX IF NOT EXISTS idx_{table}_remark_time ON {table} (remark_time);",
     "CREATE INDEX IF NOT EXISTS idx_{table}_covers ON {table} (json_valid(covers));"
 ]
@@ -48,9 +48,11 @@ from routers import (
     video_details,
     dynamic
 )
+from scripts.dynamic_media import close_media_session, warm_up_media_session
 from scripts.scheduler_db_enhanced import EnhancedSchedulerDB
+from scripts.send_log_email import close_smtp_connection
 from scripts.scheduler_manager import SchedulerManager
-from scripts.utils import load_config, get_output_path
+from scripts.utils import load_config, get_output_path, close_db_pool
 
 
 # 配置日志系统
@@ -294,6 +296,9 @@ async def lifespan(app: FastAPI):
         # 创建异步任务运行调度器
         scheduler_task = asyncio.create_task(scheduler_manager.run_scheduler())
 
+        # 后台预热动态媒体下载的CDN连接，不阻塞启动
+        warm_up_task = asyncio.create_task(warm_up_media_session())
+
         # 加载配置并决定是否执行数据完整性校验
         current_config = load_config()
         check_on_startup = current_config.get('server', {}).get('data_integrity', {}).get('check_on_startup', True)
@@ -339,6 +344,16 @@ async def lifespan(app: FastAPI):
             except asyncio.CancelledError:
                 logger.info("调度器任务已取消")
 
+        # 关闭所有连接池中的空闲数据库连接
+        close_db_pool()
+
+        # 关闭动态媒体下载共享的HTTP会话（预热若仍未结束则先取消）
+        warm_up_task.cancel()
+        await close_media_session()
+
+        # 关闭复用的SMTP连接
+        close_smtp_connection()
+
         # 恢复原始的 stdout
         if hasattr(sys.stdout, 'stdout'):
             logger.info("正在恢复标准输出...")
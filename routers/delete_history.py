@@ -112,6 +112,11 @@ async def batch_delete_history(items: List[DeleteHistoryItem]):
 
         conn.commit()
 
+        # 删除记录后物化的分析结果已过期
+        if total_deleted > 0:
+            from .viewing_analytics import clear_history_summary
+            clear_history_summary()
+
         # 如果有记录被删除，更新last_import.json
         if total_deleted > 0 and min_timestamp != float('inf'):
             update_last_import_time(min_timestamp - 1)  # 减1秒以确保能获取到被删除时间点的记录
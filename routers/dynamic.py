@@ -1,3 +1,4 @@
+import json
 import os
 import asyncio
 from typing import Optional, Dict, Any, List
@@ -6,22 +7,42 @@ from fastapi.responses import StreamingResponse
 from loguru import logger
 import aiohttp
 import aiofiles
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 from scripts.utils import load_config, setup_logger, get_output_path
 from scripts.dynamic_db import (
     get_connection,
     save_normalized_dynamic_item,
+    save_normalized_dynamic_items,
     list_hosts_with_stats,
     list_dynamics_for_host,
     dynamic_core_exists,
 )
-from scripts.dynamic_media import collect_image_urls, download_images, predict_image_path, collect_live_media_urls, download_live_media, collect_emoji_urls, download_emojis
+from scripts.dynamic_media import collect_all_media, download_images, predict_image_path, download_dynamic_media
 
 # 确保日志系统已初始化
 setup_logger()
 
 router = APIRouter()
 
+# 回写媒体本地路径（逗号分隔），已有值时保留原值
+UPDATE_MEDIA_LOCALS_SQL = """
+    UPDATE dynamic_core SET
+        media_locals = CASE
+            WHEN media_locals IS NULL OR media_locals = '' THEN ?
+            ELSE media_locals
+        END,
+        live_media_locals = CASE
+            WHEN live_media_locals IS NULL OR live_media_locals = '' THEN ?
+            ELSE live_media_locals
+        END,
+        live_media_count = ?
+    WHERE host_mid = ? AND id_str = ?
+"""
+
 # 任务管理：按 host_mid 管理抓取任务、停止信号与进度
 _tasks = {}
 _stop_events = {}
@@ -232,7 +253,8 @@ async def fetch_dynamic_data(api_url: str, params: Dict[str, Any]) -> Dict[str,
                     # 内容类型保护：仅当返回为 JSON 时才解析为 JSON
                     content_type = response.headers.get("Content-Type", "")
                     if "application/json" in content_type or "text/json" in content_type or "application/vnd" in content_type:
-                        data = await response.json()
+                        # 优先使用orjson解析，未安装时回退到标准库json
+                        data = await response.json(loads=orjson.loads if orjson else json.loads)
                     else:
                         # 非JSON返回，读取少量文本用于错误提示（不抛出二次异常）
                         try:
@@ -450,6 +472,8 @@ async def auto_fetch_all(
                 except Exception as e:
                     logger.warning(f"保存头像失败（忽略）：{e}")
                 
+                pending_items: List[Dict[str, Any]] = []
+                media_updates = []
                 for item in items:
                     try:
                         id_str = (
@@ -461,104 +485,65 @@ async def auto_fetch_all(
                             continue
 
                         # 检查是否有多媒体文件需要下载
-                        has_media = False
                         predicted_locals = []
                         live_predicted_locals = []
                         if save_media:
-                            # 处理普通图片
-                            image_urls = collect_image_urls(item)
-                            if image_urls:
-                                has_media = True
+                            # 一次遍历抽取图片、实况媒体和表情
+                            image_urls, live_media_pairs, emoji_pairs = collect_all_media(item)
+                            if image_urls or live_media_pairs or emoji_pairs:
                                 # 只有当包含多媒体文件时才创建文件夹
                                 item_dir = os.path.dirname(
                                     get_output_path("dynamic", str(host_mid), str(id_str), "media")
                                 )
                                 os.makedirs(item_dir, exist_ok=True)
-                                
+
                                 # 预测本地路径
                                 for u in image_urls:
                                     predicted_locals.append(os.path.relpath(predict_image_path(u, item_dir), base_output_dir))
-                                
-                                results = await download_images(image_urls, item_dir)
-                                media_records = []
-                                for media_url, local_path, ok in results:
-                                    if ok:
-                                        rel_path = os.path.relpath(local_path, base_output_dir)
-                                        media_records.append((media_url, rel_path, "image"))
-                            
-                            # 处理实况媒体（live图片+视频）
-                            live_media_pairs = collect_live_media_urls(item)
-                            if live_media_pairs:
-                                has_media = True
-                                # 创建文件夹（如果还未创建）
-                                if not image_urls:
-                                    item_dir = os.path.dirname(
-                                        get_output_path("dynamic", str(host_mid), str(id_str), "media")
-                                    )
-                                    os.makedirs(item_dir, exist_ok=True)
-                                
-                                live_results = await download_live_media(live_media_pairs, item_dir)
+
+                                # 图片、实况媒体和表情并发下载
+                                _, live_results, emoji_results = await download_dynamic_media(
+                                    image_urls, live_media_pairs, emoji_pairs, item_dir
+                                )
                                 for image_url, video_url, image_path, video_path, ok in live_results:
                                     if ok:
                                         # 将实况媒体路径分别记录
                                         image_rel = os.path.relpath(image_path, base_output_dir)
                                         video_rel = os.path.relpath(video_path, base_output_dir)
                                         live_predicted_locals.extend([image_rel, video_rel])
-                            
-                            # 处理表情
-                            emoji_pairs = collect_emoji_urls(item)
-                            if emoji_pairs:
-                                has_media = True
-                                # 创建文件夹（如果还未创建）
-                                if not image_urls and not live_media_pairs:
-                                    item_dir = os.path.dirname(
-                                        get_output_path("dynamic", str(host_mid), str(id_str), "media")
-                                    )
-                                    os.makedirs(item_dir, exist_ok=True)
-                                
-                                emoji_results = await download_emojis(emoji_pairs, item_dir)
                                 for emoji_url, emoji_path, ok in emoji_results:
                                     if ok:
                                         # 将表情路径记录到普通媒体中
                                         emoji_rel = os.path.relpath(emoji_path, base_output_dir)
                                         predicted_locals.append(emoji_rel)
 
-                        # 规范化保存到数据库
-                        logger.info(f"normalize.core.call begin host_mid={host_mid} id_str={id_str}")
-                        try:
-                            save_normalized_dynamic_item(conn, host_mid, item)
-                            logger.info(f"normalize.core.call done host_mid={host_mid} id_str={id_str}")
-                            # 回写本地路径逗号串（只有当有多媒体文件时）
-                            if predicted_locals or live_predicted_locals:
-                                cursor = conn.cursor()
-                                cursor.execute(
-                                    """
-                                    UPDATE dynamic_core SET
-                                        media_locals = CASE
-                                            WHEN media_locals IS NULL OR media_locals = '' THEN ?
-                                            ELSE media_locals
-                                        END,
-                                        live_media_locals = CASE
-                                            WHEN live_media_locals IS NULL OR live_media_locals = '' THEN ?
-                                            ELSE live_media_locals
-                                        END,
-                                        live_media_count = ?
-                                    WHERE host_mid = ? AND id_str = ?
-                                    """,
-                                    (
-                                        ",".join(predicted_locals) if predicted_locals else "",
-                                        ",".join(live_predicted_locals) if live_predicted_locals else "",
-                                        len(live_predicted_locals),
-                                        str(host_mid),
-                                        str(id_str),
-                                    ),
-                                )
-                                conn.commit()
-                        except Exception as norm_err:
-                            logger.warning(f"规范化保存失败（忽略）: {norm_err}")
+                        # 先收集，整批规范化保存到数据库
+                        pending_items.append(item)
+                        # 记录需回写的本地路径逗号串（只有当有多媒体文件时）
+                        if predicted_locals or live_predicted_locals:
+                            media_updates.append((
+                                ",".join(predicted_locals) if predicted_locals else "",
+                                ",".join(live_predicted_locals) if live_predicted_locals else "",
+                                len(live_predicted_locals),
+                                str(host_mid),
+                                str(id_str),
+                            ))
                     except Exception as perr:
                         logger.warning(f"保存页面数据失败: {perr}")
 
+                # 整批写入核心/作者/统计表并回写媒体路径，只提交一次事务
+                if pending_items:
+                    logger.info(f"normalize.core.call begin host_mid={host_mid} count={len(pending_items)}")
+                    try:
+                        save_normalized_dynamic_items(conn, host_mid, pending_items, commit=False)
+                        if media_updates:
+                            conn.cursor().executemany(UPDATE_MEDIA_LOCALS_SQL, media_updates)
+                        conn.commit()
+                        logger.info(f"normalize.core.call done host_mid={host_mid} count={len(pending_items)}")
+                    except Exception as norm_err:
+                        conn.rollback()
+                        logger.warning(f"规范化保存失败（忽略）: {norm_err}")
+
             # 更新 meta
             meta["last_fetch_time"] = int(time.time())
             meta["last_offset"] = {"offset": next_offset or "", "update_baseline": "", "update_num": 0}
@@ -763,6 +748,8 @@ async def get_space_dynamic(
             except Exception as e:
                 logger.warning(f"写入 host_mid 元数据失败（忽略）：{e}")
 
+            pending_items: List[Dict[str, Any]] = []
+            media_updates = []
             for item in items:
                 try:
                     id_str = (
@@ -775,105 +762,65 @@ async def get_space_dynamic(
                         continue
 
                     # 检查是否有多媒体文件需要下载
-                    has_media = False
                     predicted_locals = []
                     live_predicted_locals = []
                     if save_media:
-                        # 处理普通图片
-                        image_urls = collect_image_urls(item)
-                        if image_urls:
-                            has_media = True
+                        # 一次遍历抽取图片、实况媒体和表情
+                        image_urls, live_media_pairs, emoji_pairs = collect_all_media(item)
+                        if image_urls or live_media_pairs or emoji_pairs:
                             # 只有当包含多媒体文件时才创建文件夹
                             item_dir = os.path.dirname(
                                 get_output_path("dynamic", str(host_mid), str(id_str), "media")
                             )
                             os.makedirs(item_dir, exist_ok=True)
-                            
+
                             # 预测本地路径
                             for u in image_urls:
                                 predicted_locals.append(os.path.relpath(predict_image_path(u, item_dir), base_output_dir))
-                            
-                            # 下载多媒体文件
-                            results = await download_images(image_urls, item_dir)
-                            media_records = []
-                            for media_url, local_path, ok in results:
-                                if ok:
-                                    rel_path = os.path.relpath(local_path, base_output_dir)
-                                    media_records.append((media_url, rel_path, "image"))
-                        
-                        # 处理实况媒体（live图片+视频）
-                        live_media_pairs = collect_live_media_urls(item)
-                        if live_media_pairs:
-                            has_media = True
-                            # 创建文件夹（如果还未创建）
-                            if not image_urls:
-                                item_dir = os.path.dirname(
-                                    get_output_path("dynamic", str(host_mid), str(id_str), "media")
-                                )
-                                os.makedirs(item_dir, exist_ok=True)
-                            
-                            live_results = await download_live_media(live_media_pairs, item_dir)
+
+                            # 图片、实况媒体和表情并发下载
+                            _, live_results, emoji_results = await download_dynamic_media(
+                                image_urls, live_media_pairs, emoji_pairs, item_dir
+                            )
                             for image_url, video_url, image_path, video_path, ok in live_results:
                                 if ok:
                                     # 将实况媒体路径分别记录
                                     image_rel = os.path.relpath(image_path, base_output_dir)
                                     video_rel = os.path.relpath(video_path, base_output_dir)
                                     live_predicted_locals.extend([image_rel, video_rel])
-                        
-                        # 处理表情
-                        emoji_pairs = collect_emoji_urls(item)
-                        if emoji_pairs:
-                            has_media = True
-                            # 创建文件夹（如果还未创建）
-                            if not image_urls and not live_media_pairs:
-                                item_dir = os.path.dirname(
-                                    get_output_path("dynamic", str(host_mid), str(id_str), "media")
-                                )
-                                os.makedirs(item_dir, exist_ok=True)
-                            
-                            emoji_results = await download_emojis(emoji_pairs, item_dir)
                             for emoji_url, emoji_path, ok in emoji_results:
                                 if ok:
                                     # 将表情路径记录到普通媒体中
                                     emoji_rel = os.path.relpath(emoji_path, base_output_dir)
                                     predicted_locals.append(emoji_rel)
 
-                    # 规范化保存到数据库
-                    logger.info(f"normalize.core.call begin host_mid={host_mid} id_str={id_str}")
-                    try:
-                        save_normalized_dynamic_item(conn, host_mid, item)
-                        logger.info(f"normalize.core.call done host_mid={host_mid} id_str={id_str}")
-                        # 回写本地路径逗号串（只有当有多媒体文件时）
-                        if predicted_locals or live_predicted_locals:
-                            cursor = conn.cursor()
-                            cursor.execute(
-                                """
-                                UPDATE dynamic_core SET
-                                    media_locals = CASE
-                                        WHEN media_locals IS NULL OR media_locals = '' THEN ?
-                                        ELSE media_locals
-                                    END,
-                                    live_media_locals = CASE
-                                        WHEN live_media_locals IS NULL OR live_media_locals = '' THEN ?
-                                        ELSE live_media_locals
-                                    END,
-                                    live_media_count = ?
-                                WHERE host_mid = ? AND id_str = ?
-                                """,
-                                (
-                                    ",".join(predicted_locals) if predicted_locals else "",
-                                    ",".join(live_predicted_locals) if live_predicted_locals else "",
-                                    len(live_predicted_locals),
-                                    str(host_mid),
-                                    str(id_str),
-                                ),
-                            )
-                            conn.commit()
-                    except Exception as norm_err:
-                        logger.warning(f"规范化保存失败（忽略）: {norm_err}")
+                    # 先收集，整批规范化保存到数据库
+                    pending_items.append(item)
+                    # 记录需回写的本地路径逗号串（只有当有多媒体文件时）
+                    if predicted_locals or live_predicted_locals:
+                        media_updates.append((
+                            ",".join(predicted_locals) if predicted_locals else "",
+                            ",".join(live_predicted_locals) if live_predicted_locals else "",
+                            len(live_predicted_locals),
+                            str(host_mid),
+                            str(id_str),
+                        ))
                 except Exception as perr:
                     logger.error(f"保存动态项失败 id_str={item.get('id_str')}: {perr}")
 
+            # 整批写入核心/作者/统计表并回写媒体路径，只提交一次事务
+            if pending_items:
+                logger.info(f"normalize.core.call begin host_mid={host_mid} count={len(pending_items)}")
+                try:
+                    save_normalized_dynamic_items(conn, host_mid, pending_items, commit=False)
+                    if media_updates:
+                        conn.cursor().executemany(UPDATE_MEDIA_LOCALS_SQL, media_updates)
+                    conn.commit()
+                    logger.info(f"normalize.core.call done host_mid={host_mid} count={len(pending_items)}")
+                except Exception as norm_err:
+                    conn.rollback()
+                    logger.warning(f"规范化保存失败（忽略）: {norm_err}")
+
             try:
                 conn.close()
             except Exception:
@@ -955,63 +902,32 @@ async def get_dynamic_detail(
 
                     # 检查是否有多媒体文件需要下载
                     base_output_dir = os.path.dirname(get_output_path("__base__"))
-                    has_media = False
                     predicted_locals = []
                     live_predicted_locals = []
                     if save_media:
-                        # 处理普通图片
-                        image_urls = collect_image_urls(item)
-                        if image_urls:
-                            has_media = True
+                        # 一次遍历抽取图片、实况媒体和表情
+                        image_urls, live_media_pairs, emoji_pairs = collect_all_media(item)
+                        if image_urls or live_media_pairs or emoji_pairs:
                             # 只有当包含多媒体文件时才创建文件夹
                             item_dir = os.path.dirname(
                                 get_output_path("dynamic", str(host_mid_int), str(id_str), "media")
                             )
                             os.makedirs(item_dir, exist_ok=True)
-                            
+
                             # 预测本地路径
                             for u in image_urls:
                                 predicted_locals.append(os.path.relpath(predict_image_path(u, item_dir), base_output_dir))
-                            
-                            # 下载多媒体文件
-                            results = await download_images(image_urls, item_dir)
-                            media_records = []
-                            for media_url, local_path, ok in results:
-                                if ok:
-                                    rel_path = os.path.relpath(local_path, base_output_dir)
-                                    media_records.append((media_url, rel_path, "image"))
-                        
-                        # 处理实况媒体（live图片+视频）
-                        live_media_pairs = collect_live_media_urls(item)
-                        if live_media_pairs:
-                            has_media = True
-                            # 创建文件夹（如果还未创建）
-                            if not image_urls:
-                                item_dir = os.path.dirname(
-                                    get_output_path("dynamic", str(host_mid_int), str(id_str), "media")
-                                )
-                                os.makedirs(item_dir, exist_ok=True)
-                            
-                            live_results = await download_live_media(live_media_pairs, item_dir)
+
+                            # 图片、实况媒体和表情并发下载
+                            _, live_results, emoji_results = await download_dynamic_media(
+                                image_urls, live_media_pairs, emoji_pairs, item_dir
+                            )
                             for image_url, video_url, image_path, video_path, ok in live_results:
                                 if ok:
                                     # 将实况媒体路径分别记录
                                     image_rel = os.path.relpath(image_path, base_output_dir)
                                     video_rel = os.path.relpath(video_path, base_output_dir)
                                     live_predicted_locals.extend([image_rel, video_rel])
-                        
-                        # 处理表情
-                        emoji_pairs = collect_emoji_urls(item)
-                        if emoji_pairs:
-                            has_media = True
-                            # 创建文件夹（如果还未创建）
-                            if not image_urls and not live_media_pairs:
-                                item_dir = os.path.dirname(
-                                    get_output_path("dynamic", str(host_mid_int), str(id_str), "media")
-                                )
-                                os.makedirs(item_dir, exist_ok=True)
-                            
-                            emoji_results = await download_emojis(emoji_pairs, item_dir)
                             for emoji_url, emoji_path, ok in emoji_results:
                                 if ok:
                                     # 将表情路径记录到普通媒体中
@@ -1065,19 +981,7 @@ async def get_dynamic_detail(
                         if predicted_locals or live_predicted_locals:
                             cursor = conn.cursor()
                             cursor.execute(
-                                """
-                                UPDATE dynamic_core SET
-                                    media_locals = CASE
-                                        WHEN media_locals IS NULL OR media_locals = '' THEN ?
-                                        ELSE media_locals
-                                    END,
-                                    live_media_locals = CASE
-                                        WHEN live_media_locals IS NULL OR live_media_locals = '' THEN ?
-                                        ELSE live_media_locals
-                                    END,
-                                    live_media_count = ?
-                                WHERE host_mid = ? AND id_str = ?
-                                """,
+                                UPDATE_MEDIA_LOCALS_SQL,
                                 (
                                     ",".join(predicted_locals) if predicted_locals else "",
                                     ",".join(live_predicted_locals) if live_predicted_locals else "",
@@ -88,6 +88,11 @@ async def get_bili_history_realtime(sync_deleted: bool = False, process_video_de
             logger.info(f"同步已删除记录: {sync_deleted}")
             db_result = import_all_history_files(sync_deleted=sync_deleted)
 
+            # 导入可能创建了新年份的表或同步删除了记录，清空分析接口的可用年份缓存和物化结果
+            from .viewing_analytics import clear_available_years_cache, clear_history_summary
+            clear_available_years_cache()
+            clear_history_summary()
+
             if db_result["status"] == "success":
                 history_result["inserted_count"] = db_result['inserted_count']
                 history_result["status"] = "success"
@@ -781,10 +781,15 @@ async def reset_database():
         db_path = get_output_path(config['db_file'])
         last_import_path = get_output_path('last_import.json')
 
-        # 删除数据库文件
+        # 删除数据库文件（先关闭所有连接池中仍打开的连接）
         if os.path.exists(db_path):
             try:
+                from scripts.utils import close_db_pool
+                from .viewing_analytics import clear_available_years_cache
+                close_db_pool()
                 os.remove(db_path)
+                # 年份表已随数据库文件一起删除
+                clear_available_years_cache()
             except Exception as e:
                 raise HTTPException(
                     status_code=500,
@@ -12,6 +12,11 @@ class ImportHistoryResponse(BaseModel):
 def import_history():
     result = import_all_history_files()
 
+    # 导入可能创建了新年份的表或改写了已有记录，清空分析接口的可用年份缓存和物化结果
+    from .viewing_analytics import clear_available_years_cache, clear_history_summary
+    clear_available_years_cache()
+    clear_history_summary()
+
     if result["status"] == "success":
         return {"status": "success", "message": result["message"]}
     else:
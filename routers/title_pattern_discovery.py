@@ -1,6 +1,10 @@
 import json
 import os
 import sqlite3
+try:
+    import orjson
+except ImportError:
+    orjson = None
 from collections import Counter, defaultdict
 from typing import List, Dict, Tuple, Set, Optional
 
@@ -101,10 +105,11 @@ class PatternCache:
                 return None
             
             print(f"读取缓存文件: {cache_path}")
-            with open(cache_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                print(f"成功读取缓存数据，包含 {len(data)} 个模式")
-                return data
+            with open(cache_path, 'rb') as f:
+                raw = f.read()
+            data = orjson.loads(raw) if orjson else json.loads(raw)
+            print(f"成功读取缓存数据，包含 {len(data)} 个模式")
+            return data
                 
         except Exception as e:
             print(f"读取缓存时出错: {str(e)}")
@@ -133,8 +138,14 @@ class PatternCache:
             # 确保目录存在
             os.makedirs(os.path.dirname(cache_path), exist_ok=True)
             
-            with open(cache_path, 'w', encoding='utf-8') as f:
-                json.dump(patterns, f, ensure_ascii=False, indent=2)
+            # 优先使用orjson序列化，未安装时回退到标准库json
+            if orjson:
+                payload = orjson.dumps(patterns, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+            else:
+                payload = json.dumps(patterns, ensure_ascii=False).encode('utf-8')
+
+            with open(cache_path, 'wb') as f:
+                f.write(payload)
                 print(f"成功写入缓存: {cache_path}")
                 
         except Exception as e:
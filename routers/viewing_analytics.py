@@ -1,18 +1,145 @@
+import asyncio
+import json
+import math
 import sqlite3
+import time
 from datetime import datetime
+from operator import itemgetter
 from typing import Optional
 
-from fastapi import APIRouter, Query, HTTPException
+import numpy as np
+from fastapi import APIRouter, Query, HTTPException, BackgroundTasks, Response
 
-from scripts.utils import load_config, get_output_path
+from scripts.utils import load_config, get_output_path, get_pooled_connection
 
 router = APIRouter()
 config = load_config()
 
+# 分析接口的连接每个初始化时设置的 PRAGMA
+DB_POOL_PRAGMAS = (
+    ('cache_size', -65536),      # 64MB 页缓存
+    ('mmap_size', 268435456),    # 256MB 内存映射
+    ('temp_store', 'MEMORY'),
+)
+
 def get_db():
-    """获取数据库连接"""
-    db_path = get_output_path(config['db_file'])
-    return sqlite3.connect(db_path)
+    """获取数据库连接
+
+    从 scripts.utils 的连接池中复用空闲连接，调用方照常 close() 即可归还
+    """
+    return get_pooled_connection(get_output_path(config['db_file']), DB_POOL_PRAGMAS)
+
+def _ensure_history_summary_table(cursor) -> None:
+    """确保分析结果汇总表存在"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS history_summary (
+            table_name TEXT NOT NULL,
+            metric TEXT NOT NULL,
+            json_payload TEXT NOT NULL,
+            last_view_at INTEGER,
+            max_rowid INTEGER,
+            row_count INTEGER,
+            updated_at INTEGER NOT NULL,
+            PRIMARY KEY (table_name, metric)
+        )
+    """)
+    # 旧版汇总表没有 row_count 列，补上后旧结果因水位不匹配自然失效
+    cursor.execute("PRAGMA table_info(history_summary)")
+    if 'row_count' not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute("ALTER TABLE history_summary ADD COLUMN row_count INTEGER")
+
+def _get_table_watermark(cursor, table_name: str) -> tuple:
+    """获取历史记录表的数据水位（最大rowid、最新观看时间和记录数），用于判断汇总是否过期
+
+    两个MAX分别放在子查询中，才能各自走rowid和view_at索引直接定位，而不是扫描全表；
+    COUNT(*) 用于发现删除了非最新记录的情况。原地修改记录不会改变水位，
+    由写入路径调用 clear_history_summary() 使汇总失效
+    """
+    cursor.execute(
+        f"SELECT (SELECT MAX(rowid) FROM {table_name}), (SELECT MAX(view_at) FROM {table_name}), "
+        f"(SELECT COUNT(*) FROM {table_name})"
+    )
+    return cursor.fetchone()
+
+def load_history_summary_payload(cursor, table_name: str, metric: str) -> Optional[str]:
+    """读取物化的分析结果（未反序列化的JSON文本）
+
+    Args:
+        cursor: 数据库游标
+        table_name: 历史记录表名
+        metric: 分析指标名称
+
+    Returns:
+        str | None: 汇总结果JSON；若不存在或原表在物化之后有新增/删除记录则返回None
+    """
+    try:
+        cursor.execute("""
+            SELECT json_payload, max_rowid, last_view_at, row_count
+            FROM history_summary
+            WHERE table_name = ? AND metric = ?
+        """, (table_name, metric))
+    except sqlite3.OperationalError:
+        # 汇总表尚未创建（首次写入汇总时才建表）或仍是缺少 row_count 列的旧结构
+        return None
+    row = cursor.fetchone()
+    if row is None:
+        return None
+
+    json_payload, max_rowid, last_view_at, row_count = row
+    if _get_table_watermark(cursor, table_name) != (max_rowid, last_view_at, row_count):
+        return None
+
+    return json_payload
+
+def load_cached_response(cursor, table_name: str, metric: str) -> Optional[Response]:
+    """从汇总表读取已序列化且未过期的分析结果
+
+    缓存命中时直接把JSON文本作为响应返回，省去反序列化再由FastAPI重新序列化的开销
+
+    Returns:
+        Response | None: 缓存命中时的JSON响应，未命中或已过期返回None
+    """
+    payload = load_history_summary_payload(cursor, table_name, metric)
+    if not payload:
+        return None
+    return Response(content=payload, media_type="application/json")
+
+def save_history_summary(table_name: str, metric: str, payload: dict) -> None:
+    """将分析结果物化到汇总表，并记录当前数据水位"""
+    conn = get_db()
+    try:
+        cursor = conn.cursor()
+        _ensure_history_summary_table(cursor)
+        max_rowid, last_view_at, row_count = _get_table_watermark(cursor, table_name)
+        cursor.execute("""
+            INSERT INTO history_summary (table_name, metric, json_payload, last_view_at, max_rowid, row_count, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(table_name, metric) DO UPDATE SET
+                json_payload = excluded.json_payload,
+                last_view_at = excluded.last_view_at,
+                max_rowid = excluded.max_rowid,
+                row_count = excluded.row_count,
+                updated_at = excluded.updated_at
+        """, (table_name, metric, json.dumps(payload, ensure_ascii=False), last_view_at, max_rowid, row_count, int(time.time())))
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"写入分析汇总表时发生错误: {e}")
+    finally:
+        conn.close()
+
+def clear_history_summary() -> None:
+    """清空物化的分析结果（导入、同步或删除历史记录后调用）"""
+    conn = get_db()
+    try:
+        conn.execute("DELETE FROM history_summary")
+        conn.commit()
+    except sqlite3.OperationalError:
+        # 汇总表尚未创建，无需清理
+        pass
+    except sqlite3.Error as e:
+        print(f"清空分析汇总表时发生错误: {e}")
+    finally:
+        conn.close()
 
 def generate_continuity_insights(continuity_data: dict) -> dict:
     """生成连续性相关的洞察"""
@@ -51,7 +178,7 @@ def analyze_viewing_continuity(cursor, table_name: str) -> dict:
         FROM {table_name}
         ORDER BY view_date
     """)
-    dates = [row[0] for row in cursor.fetchall()]
+    dates = [view_date for (view_date,) in cursor]
     
     # 计算连续观看天数
     max_streak = current_streak = 1
@@ -124,131 +251,81 @@ def analyze_time_investment(cursor, table_name: str) -> dict:
         'avg_daily_duration': avg_daily_duration
     }
 
-def analyze_completion_rates(cursor, table_name: str) -> dict:
-    """分析视频完成率"""
-    # 获取表结构
-    cursor.execute(f"PRAGMA table_info({table_name})")
-    columns = {col[1]: idx for idx, col in enumerate(cursor.fetchall())}
-    
-    # 确保必要的列存在
-    required_columns = ['duration', 'progress', 'author_name', 'author_mid', 'tag_name']
+# 分批读取查询结果时每批的行数
+FETCH_BATCH_SIZE = 4096
+
+# 已校验过列结构的表及其列名集合
+_table_columns_cache = {}
+
+def _require_columns(cursor, table_name: str, required_columns: list) -> None:
+    """确保表中存在所需的列，每个表的列结构在进程内只查询一次"""
+    columns = _table_columns_cache.get(table_name)
+    if columns is None:
+        cursor.execute(f"PRAGMA table_info({table_name})")
+        columns = frozenset(col[1] for col in cursor.fetchall())
+        if columns:
+            _table_columns_cache[table_name] = columns
+
     for col in required_columns:
         if col not in columns:
             raise ValueError(f"Required column '{col}' not found in table {table_name}")
+
+def analyze_completion_rates(cursor, table_name: str) -> dict:
+    """分析视频完成率"""
+    # 确保必要的列存在
+    _require_columns(cursor, table_name, ['duration', 'progress'])
     
-    cursor.execute(f"SELECT * FROM {table_name}")
-    histories = cursor.fetchall()
-    
-    # 基础统计
-    total_videos = len(histories)
-    total_completion = 0
-    fully_watched = 0
-    not_started = 0
-    
-    # UP主统计
-    author_stats = {}
-    # 分区统计
-    tag_stats = {}
-    # 时长分布统计
-    duration_stats = {
-        "短视频(≤5分钟)": {"video_count": 0, "total_completion": 0, "fully_watched": 0, "average_completion_rate": 0},
-        "中等视频(5-20分钟)": {"video_count": 0, "total_completion": 0, "fully_watched": 0, "average_completion_rate": 0},
-        "长视频(>20分钟)": {"video_count": 0, "total_completion": 0, "fully_watched": 0, "average_completion_rate": 0}
-    }
-    # 完成率分布
+    # 只读取时长和进度两列；以文本形式存储的数值由CAST转换，空值和空字符串按0处理
+    cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
+    total_videos = cursor.fetchone()[0]
+    cursor.execute(f"""
+        SELECT CAST(IFNULL(duration, 0) AS REAL), CAST(IFNULL(progress, 0) AS REAL)
+        FROM {table_name}
+    """)
+    values = np.array(cursor.fetchall(), dtype=np.float64).reshape(-1, 2)
+    durations = values[:, 0]
+    progresses = values[:, 1]
+
+    # 计算完成率，当progress为-1时表示已完全观看，计算为100%
+    safe_durations = np.where(durations > 0, durations, 1)
+    completion_rates = np.where(
+        progresses == -1,
+        100.0,
+        np.where(durations > 0, progresses / safe_durations * 100, 0.0)
+    )
+    fully_watched_mask = completion_rates >= 90  # 90%以上视为完整观看
+
+    total_completion = float(completion_rates.sum())
+    fully_watched = int(np.count_nonzero(fully_watched_mask))
+    not_started = int(np.count_nonzero(completion_rates == 0))
+
+    # 完成率分布，区间为左开右闭
+    distribution_labels = ["0-10%", "10-30%", "30-50%", "50-70%", "70-90%", "90-100%"]
+    distribution_counts = np.bincount(
+        np.searchsorted([10, 30, 50, 70, 90], completion_rates, side='left'),
+        minlength=len(distribution_labels)
+    )
     completion_distribution = {
-        "0-10%": 0,
-        "10-30%": 0,
-        "30-50%": 0,
-        "50-70%": 0,
-        "70-90%": 0,
-        "90-100%": 0
+        label: int(count) for label, count in zip(distribution_labels, distribution_counts)
     }
-    
-    for history in histories:
-        # 获取并转换数据类型
-        try:
-            duration = float(history[columns['duration']]) if history[columns['duration']] else 0
-            progress = float(history[columns['progress']]) if history[columns['progress']] else 0
-            author_name = history[columns['author_name']]
-            author_mid = history[columns['author_mid']]
-            tag_name = history[columns['tag_name']]
-        except (ValueError, TypeError) as e:
-            print(f"Warning: Failed to process record: {history}")
-            continue
-        
-        # 计算完成率
-        # 当progress为-1时表示已完全观看，计算为100%
-        if progress == -1:
-            completion_rate = 100
-        else:
-            completion_rate = (progress / duration * 100) if duration > 0 else 0
-        
-        total_completion += completion_rate
-        
-        # 统计完整观看和未开始观看
-        if completion_rate >= 90:  # 90%以上视为完整观看
-            fully_watched += 1
-        elif completion_rate == 0:
-            not_started += 1
-        
-        # 更新完成率分布
-        if completion_rate <= 10:
-            completion_distribution["0-10%"] += 1
-        elif completion_rate <= 30:
-            completion_distribution["10-30%"] += 1
-        elif completion_rate <= 50:
-            completion_distribution["30-50%"] += 1
-        elif completion_rate <= 70:
-            completion_distribution["50-70%"] += 1
-        elif completion_rate <= 90:
-            completion_distribution["70-90%"] += 1
-        else:
-            completion_distribution["90-100%"] += 1
-        
-        # UP主统计
-        if author_name and author_mid:
-            if author_name not in author_stats:
-                author_stats[author_name] = {
-                    "author_mid": author_mid,
-                    "video_count": 0,
-                    "total_completion": 0,
-                    "fully_watched": 0
-                }
-            stats = author_stats[author_name]
-            stats["video_count"] += 1
-            stats["total_completion"] += completion_rate
-            if completion_rate >= 90:
-                stats["fully_watched"] += 1
-        
-        # 分区统计
-        if tag_name:
-            if tag_name not in tag_stats:
-                tag_stats[tag_name] = {
-                    "video_count": 0,
-                    "total_completion": 0,
-                    "fully_watched": 0
-                }
-            stats = tag_stats[tag_name]
-            stats["video_count"] += 1
-            stats["total_completion"] += completion_rate
-            if completion_rate >= 90:
-                stats["fully_watched"] += 1
-        
-        # 时长分布统计
-        if duration <= 300:  # 5分钟
-            category = "短视频(≤5分钟)"
-        elif duration <= 1200:  # 20分钟
-            category = "中等视频(5-20分钟)"
-        else:
-            category = "长视频(>20分钟)"
-        
-        stats = duration_stats[category]
-        stats["video_count"] += 1
-        stats["total_completion"] += completion_rate
-        if completion_rate >= 90:
-            stats["fully_watched"] += 1
-    
+
+    # 时长分布统计，5分钟和20分钟为分界
+    duration_labels = ["短视频(≤5分钟)", "中等视频(5-20分钟)", "长视频(>20分钟)"]
+    duration_idx = np.searchsorted([300, 1200], durations, side='left')
+    category_counts = np.bincount(duration_idx, minlength=len(duration_labels))
+    category_completion = np.bincount(duration_idx, weights=completion_rates, minlength=len(duration_labels))
+    category_fully_watched = np.bincount(duration_idx, weights=fully_watched_mask, minlength=len(duration_labels))
+
+    duration_stats = {}
+    for i, category in enumerate(duration_labels):
+        video_count = int(category_counts[i])
+        duration_stats[category] = {
+            "video_count": video_count,
+            "total_completion": float(category_completion[i]) if video_count else 0,
+            "fully_watched": int(category_fully_watched[i]),
+            "average_completion_rate": 0
+        }
+
     # 计算总体统计
     overall_stats = {
         "total_videos": total_videos,
@@ -268,24 +345,8 @@ def analyze_completion_rates(cursor, table_name: str) -> dict:
             stats["average_completion_rate"] = 0
             stats["fully_watched_rate"] = 0
     
-    # 计算UP主平均完成率和完整观看率，并按观看数量筛选和排序
-    filtered_authors = {}
-    for name, stats in author_stats.items():
-        if stats["video_count"] >= 5:  # 只保留观看数量>=5的UP主
-            stats["average_completion_rate"] = round(stats["total_completion"] / stats["video_count"], 2)
-            stats["fully_watched_rate"] = round(stats["fully_watched"] / stats["video_count"] * 100, 2)
-            filtered_authors[name] = stats
-
     most_watched_authors = {}
     highest_completion_authors = {}
-    
-    # 计算分区平均完成率和完整观看率，并按观看数量筛选和排序
-    filtered_tags = {}
-    for tag, stats in tag_stats.items():
-        if stats["video_count"] >= 5:  # 只保留视频数量>=5的分区
-            stats["average_completion_rate"] = round(stats["total_completion"] / stats["video_count"], 2)
-            stats["fully_watched_rate"] = round(stats["fully_watched"] / stats["video_count"] * 100, 2)
-            filtered_tags[tag] = stats
 
     top_tags = {}
     
@@ -364,15 +425,8 @@ def generate_completion_insights(completion_data: dict) -> dict:
 
 def analyze_video_watch_counts(cursor, table_name: str) -> dict:
     """分析视频观看次数"""
-    # 获取表结构
-    cursor.execute(f"PRAGMA table_info({table_name})")
-    columns = {col[1]: idx for idx, col in enumerate(cursor.fetchall())}
-    
     # 确保必要的列存在
-    required_columns = ['title', 'bvid', 'duration', 'tag_name', 'author_name']
-    for col in required_columns:
-        if col not in columns:
-            raise ValueError(f"Required column '{col}' not found in table {table_name}")
+    _require_columns(cursor, table_name, ['title', 'bvid', 'duration', 'tag_name', 'author_name'])
     
     # 获取视频观看次数统计
     cursor.execute(f"""
@@ -392,12 +446,10 @@ def analyze_video_watch_counts(cursor, table_name: str) -> dict:
         ORDER BY watch_count DESC
     """)
     
-    results = cursor.fetchall()
-    
     # 处理统计结果
     most_watched_videos = []
     total_rewatched = 0
-    total_videos = len(results)
+    total_videos = 0
     duration_distribution = {
         "短视频(≤5分钟)": 0,
         "中等视频(5-20分钟)": 0,
@@ -405,40 +457,39 @@ def analyze_video_watch_counts(cursor, table_name: str) -> dict:
     }
     tag_distribution = {}
     
-    for row in results:
-        title = row[0]
-        bvid = row[1]
-        duration = float(row[2]) if row[2] else 0
-        tag_name = row[3]
-        author_name = row[4]
-        watch_count = row[5]
-        first_view = row[6]
-        last_view = row[7]
-        
-        # 统计重复观看的视频时长分布
-        if duration <= 300:
-            duration_distribution["短视频(≤5分钟)"] += 1
-        elif duration <= 1200:
-            duration_distribution["中等视频(5-20分钟)"] += 1
-        else:
-            duration_distribution["长视频(>20分钟)"] += 1
-
-        
-        # 记录观看次数最多的视频
-        if len(most_watched_videos) < 10:
-            most_watched_videos.append({
-                "title": title,
-                "bvid": bvid,
-                "duration": duration,
-                "tag_name": tag_name,
-                "author_name": author_name,
-                "watch_count": watch_count,
-                "first_view": first_view,
-                "last_view": last_view,
-                "avg_interval": (last_view - first_view) / (watch_count - 1) if watch_count > 1 else 0
-            })
-        
-        total_rewatched += watch_count - 1
+    # 分批读取结果，避免一次性物化全部分组行
+    while True:
+        rows = cursor.fetchmany(FETCH_BATCH_SIZE)
+        if not rows:
+            break
+
+        for title, bvid, duration, tag_name, author_name, watch_count, first_view, last_view in rows:
+            total_videos += 1
+            duration = float(duration) if duration else 0
+
+            # 统计重复观看的视频时长分布
+            if duration <= 300:
+                duration_distribution["短视频(≤5分钟)"] += 1
+            elif duration <= 1200:
+                duration_distribution["中等视频(5-20分钟)"] += 1
+            else:
+                duration_distribution["长视频(>20分钟)"] += 1
+
+            # 记录观看次数最多的视频
+            if len(most_watched_videos) < 10:
+                most_watched_videos.append({
+                    "title": title,
+                    "bvid": bvid,
+                    "duration": duration,
+                    "tag_name": tag_name,
+                    "author_name": author_name,
+                    "watch_count": watch_count,
+                    "first_view": first_view,
+                    "last_view": last_view,
+                    "avg_interval": (last_view - first_view) / (watch_count - 1) if watch_count > 1 else 0
+                })
+
+            total_rewatched += watch_count - 1
     
     # 获取总视频数
     cursor.execute(f"SELECT COUNT(DISTINCT bvid) FROM {table_name}")
@@ -588,8 +639,19 @@ def _get_preferred_content_type(tag_dist: dict, duration_dist: dict) -> str:
     
     return f"{top_duration.replace('视频', '')}的{top_tag}"
 
+# 可用年份缓存的有效期（秒），新年份的表只会在导入数据时创建，无需每次请求都查询sqlite_master
+AVAILABLE_YEARS_TTL = 60
+_available_years_cache = {"years": (), "expires_at": 0.0}
+
 def get_available_years():
-    """获取数据库中所有可用的年份"""
+    """获取数据库中所有可用的年份
+
+    结果在进程内缓存 AVAILABLE_YEARS_TTL 秒，查询失败或没有数据时不缓存
+    """
+    now = time.monotonic()
+    if _available_years_cache["years"] and now < _available_years_cache["expires_at"]:
+        return list(_available_years_cache["years"])
+
     conn = get_db()
     try:
         cursor = conn.cursor()
@@ -607,7 +669,10 @@ def get_available_years():
             except (ValueError, IndexError):
                 continue
 
-        return sorted(years, reverse=True)
+        years = sorted(years, reverse=True)
+        _available_years_cache["years"] = tuple(years)
+        _available_years_cache["expires_at"] = now + AVAILABLE_YEARS_TTL
+        return years
     except sqlite3.Error as e:
         print(f"获取年份列表时发生错误: {e}")
         return []
@@ -615,6 +680,26 @@ def get_available_years():
         if conn:
             conn.close()
 
+def clear_available_years_cache() -> None:
+    """清空可用年份缓存（导入数据创建新年份的表或重置数据库后调用）"""
+    _available_years_cache["years"] = ()
+    _available_years_cache["expires_at"] = 0.0
+
+def _resolve_year(year: Optional[int], available_years: list) -> tuple:
+    """根据可用年份解析目标年份，返回 (target_year, error_message)"""
+    if not available_years:
+        return None, "未找到任何历史记录数据"
+
+    # 如果未指定年份，使用最新的年份
+    if year is None:
+        return available_years[0], None
+
+    # 检查指定的年份是否可用
+    if year not in available_years:
+        return None, f"未找到 {year} 年的历史记录数据。可用的年份有：{', '.join(map(str, available_years))}"
+
+    return year, None
+
 def validate_year_and_get_table(year: Optional[int]) -> tuple:
     """验证年份并返回表名和可用年份列表
 
@@ -626,21 +711,11 @@ def validate_year_and_get_table(year: Optional[int]) -> tuple:
     """
     # 获取可用年份列表
     available_years = get_available_years()
-    if not available_years:
+    target_year, error_message = _resolve_year(year, available_years)
+    if error_message:
         error_response = {
             "status": "error",
-            "message": "未找到任何历史记录数据"
-        }
-        return None, None, error_response
-
-    # 如果未指定年份，使用最新的年份
-    target_year = year if year is not None else available_years[0]
-
-    # 检查指定的年份是否可用
-    if year is not None and year not in available_years:
-        error_response = {
-            "status": "error",
-            "message": f"未找到 {year} 年的历史记录数据。可用的年份有：{', '.join(map(str, available_years))}"
+            "message": error_message
         }
         return None, None, error_response
 
@@ -649,12 +724,14 @@ def validate_year_and_get_table(year: Optional[int]) -> tuple:
 
 @router.get("/monthly-stats", summary="获取月度观看统计分析")
 async def get_monthly_stats(
+    background_tasks: BackgroundTasks,
     year: Optional[int] = Query(None, description="要分析的年份，不传则使用当前年份"),
     use_cache: bool = Query(True, description="是否使用缓存，默认为True。如果为False则重新分析数据")
 ):
     """获取月度观看统计分析
 
     Args:
+        background_tasks: 后台任务，用于在响应返回后写入缓存
         year: 要分析的年份，不传则使用当前年份
         use_cache: 是否使用缓存，默认为True。如果为False则重新分析数据
 
@@ -672,9 +749,8 @@ async def get_monthly_stats(
 
         # 如果启用缓存，尝试从缓存获取
         if use_cache:
-            from .title_pattern_discovery import pattern_cache
-            cached_response = pattern_cache.get_cached_patterns(table_name, 'monthly_stats')
-            if cached_response:
+            cached_response = load_cached_response(cursor, table_name, 'monthly_stats')
+            if cached_response is not None:
                 print(f"从缓存获取 {target_year} 年的月度统计分析数据")
                 return cached_response
 
@@ -689,7 +765,7 @@ async def get_monthly_stats(
             GROUP BY month
             ORDER BY month
         """)
-        monthly_stats = {row[0]: row[1] for row in cursor.fetchall()}
+        monthly_stats = dict(cursor)
 
         # 计算总视频数和活跃天数
         cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
@@ -712,8 +788,10 @@ async def get_monthly_stats(
             monthly_insights['overall_activity'] = f"今年以来，你在B站观看了{total_videos}个视频，平均每天观看{avg_daily_videos}个视频"
 
         if monthly_stats:
-            max_month = max(monthly_stats.items(), key=lambda x: x[1])
-            min_month = min(monthly_stats.items(), key=lambda x: x[1])
+            max_month_name = max(monthly_stats, key=monthly_stats.__getitem__)
+            min_month_name = min(monthly_stats, key=monthly_stats.__getitem__)
+            max_month = (max_month_name, monthly_stats[max_month_name])
+            min_month = (min_month_name, monthly_stats[min_month_name])
 
             # 计算月度趋势
             months = sorted(monthly_stats.keys())
@@ -745,9 +823,8 @@ async def get_monthly_stats(
         }
 
         # 更新缓存
-        from .title_pattern_discovery import pattern_cache
         print(f"更新 {target_year} 年的月度统计分析数据缓存")
-        pattern_cache.cache_patterns(table_name, 'monthly_stats', response)
+        background_tasks.add_task(save_history_summary, table_name, 'monthly_stats', response)
 
         return response
 
@@ -759,12 +836,14 @@ async def get_monthly_stats(
 
 @router.get("/weekly-stats", summary="获取周度观看统计分析")
 async def get_weekly_stats(
+    background_tasks: BackgroundTasks,
     year: Optional[int] = Query(None, description="要分析的年份，不传则使用当前年份"),
     use_cache: bool = Query(True, description="是否使用缓存，默认为True。如果为False则重新分析数据")
 ):
     """获取周度观看统计分析
 
     Args:
+        background_tasks: 后台任务，用于在响应返回后写入缓存
         year: 要分析的年份，不传则使用当前年份
         use_cache: 是否使用缓存，默认为True。如果为False则重新分析数据
 
@@ -782,9 +861,8 @@ async def get_weekly_stats(
 
         # 如果启用缓存，尝试从缓存获取
         if use_cache:
-            from .title_pattern_discovery import pattern_cache
-            cached_response = pattern_cache.get_cached_patterns(table_name, 'weekly_stats')
-            if cached_response:
+            cached_response = load_cached_response(cursor, table_name, 'weekly_stats')
+            if cached_response is not None:
                 print(f"从缓存获取 {target_year} 年的周度统计分析数据")
                 return cached_response
 
@@ -811,8 +889,8 @@ async def get_weekly_stats(
             ORDER BY weekday
         """)
         # 更新有数据的星期的值
-        for row in cursor.fetchall():
-            weekly_stats[weekday_mapping[row[0]]] = row[1]
+        for weekday, view_count in cursor:
+            weekly_stats[weekday_mapping[weekday]] = view_count
 
         # 季节性观看模式分析
         cursor.execute(f"""
@@ -829,17 +907,22 @@ async def get_weekly_stats(
             WHERE CAST(strftime('%m', datetime(view_at + 28800, 'unixepoch')) AS INTEGER) BETWEEN 1 AND 12
             GROUP BY season
         """)
-        seasonal_patterns = {row[0]: {'view_count': row[1], 'avg_duration': row[2]} for row in cursor.fetchall()}
+        seasonal_patterns = {
+            season: {'view_count': view_count, 'avg_duration': avg_duration}
+            for season, view_count, avg_duration in cursor
+        }
 
         # 生成周度统计洞察
         weekly_insights = {}
         if weekly_stats and active_days > 0:
-            max_weekday = max(weekly_stats.items(), key=lambda x: x[1])
-            min_weekday = min(weekly_stats.items(), key=lambda x: x[1])
+            max_weekday_name = max(weekly_stats, key=weekly_stats.__getitem__)
+            min_weekday_name = min(weekly_stats, key=weekly_stats.__getitem__)
+            max_weekday = (max_weekday_name, weekly_stats[max_weekday_name])
+            min_weekday = (min_weekday_name, weekly_stats[min_weekday_name])
 
-            # 计算工作日和周末的平均值
-            workday_avg = sum(weekly_stats[day] for day in ['周一', '周二', '周三', '周四', '周五']) / 5
-            weekend_avg = sum(weekly_stats[day] for day in ['周六', '周日']) / 2
+            # 工作日和周末的平均值（由已按星期聚合的结果计算，无需再扫描全表）
+            workday_avg = sum(weekly_stats[day] for day in ('周一', '周二', '周三', '周四', '周五')) / 5
+            weekend_avg = (weekly_stats['周六'] + weekly_stats['周日']) / 2
 
             if weekend_avg > workday_avg * 1.5:
                 week_pattern = "你是一位周末党，倾向于在周末集中补番或观看视频。"
@@ -863,9 +946,8 @@ async def get_weekly_stats(
         }
 
         # 更新缓存
-        from .title_pattern_discovery import pattern_cache
         print(f"更新 {target_year} 年的周度统计分析数据缓存")
-        pattern_cache.cache_patterns(table_name, 'weekly_stats', response)
+        background_tasks.add_task(save_history_summary, table_name, 'weekly_stats', response)
 
         return response
 
@@ -875,14 +957,23 @@ async def get_weekly_stats(
         if conn:
             conn.close()
 
+# 一天中的时间段划分：5-11时、12-17时、18-22时，其余为深夜
+TIME_SLOT_NAMES = ("清晨和上午", "下午", "傍晚和晚上", "深夜")
+HOUR_TO_TIME_SLOT_IDX = tuple(
+    0 if 5 <= hour <= 11 else 1 if 12 <= hour <= 17 else 2 if 18 <= hour <= 22 else 3
+    for hour in range(24)
+)
+
 @router.get("/time-slots", summary="获取时段观看分析")
 async def get_time_slots(
+    background_tasks: BackgroundTasks,
     year: Optional[int] = Query(None, description="要分析的年份，不传则使用当前年份"),
     use_cache: bool = Query(True, description="是否使用缓存，默认为True。如果为False则重新分析数据")
 ):
     """获取时段观看分析
 
     Args:
+        background_tasks: 后台任务，用于在响应返回后写入缓存
         year: 要分析的年份，不传则使用当前年份
         use_cache: 是否使用缓存，默认为True。如果为False则重新分析数据
 
@@ -900,9 +991,8 @@ async def get_time_slots(
 
         # 如果启用缓存，尝试从缓存获取
         if use_cache:
-            from .title_pattern_discovery import pattern_cache
-            cached_response = pattern_cache.get_cached_patterns(table_name, 'time_slots')
-            if cached_response:
+            cached_response = load_cached_response(cursor, table_name, 'time_slots')
+            if cached_response is not None:
                 print(f"从缓存获取 {target_year} 年的时段分析数据")
                 return cached_response
 
@@ -917,7 +1007,13 @@ async def get_time_slots(
             GROUP BY hour
             ORDER BY hour
         """)
-        daily_time_slots = {f"{int(row[0])}时": row[1] for row in cursor.fetchall()}
+        # 在同一次按小时聚合的结果上顺便累加各时间段的观看数
+        daily_time_slots = {}
+        time_slot_counts = [0] * len(TIME_SLOT_NAMES)
+        for hour, view_count in cursor:
+            hour = int(hour)
+            daily_time_slots[f"{hour}时"] = view_count
+            time_slot_counts[HOUR_TO_TIME_SLOT_IDX[hour]] += view_count
 
         # 最活跃时段TOP5
         cursor.execute(f"""
@@ -930,9 +1026,9 @@ async def get_time_slots(
             LIMIT 5
         """)
         peak_hours = [{
-            "hour": f"{int(row[0])}时",
-            "view_count": row[1]
-        } for row in cursor.fetchall()]
+            "hour": f"{int(hour)}时",
+            "view_count": view_count
+        } for hour, view_count in cursor]
 
         # 时间投入分析 - 使用已有的函数
         time_investment = analyze_time_investment(cursor, table_name)
@@ -956,19 +1052,8 @@ async def get_time_slots(
         # 生成时段分析洞察
         time_slot_insights = {}
         if daily_time_slots and peak_hours:
-            # 将一天分为几个时间段
-            morning = sum(daily_time_slots.get(f"{i}时", 0) for i in range(5, 12))
-            afternoon = sum(daily_time_slots.get(f"{i}时", 0) for i in range(12, 18))
-            evening = sum(daily_time_slots.get(f"{i}时", 0) for i in range(18, 23))
-            night = sum(daily_time_slots.get(f"{i}时", 0) for i in range(23, 24)) + sum(daily_time_slots.get(f"{i}时", 0) for i in range(0, 5))
-
-            time_slots = [
-                ("清晨和上午", morning),
-                ("下午", afternoon),
-                ("傍晚和晚上", evening),
-                ("深夜", night)
-            ]
-            primary_slot = max(time_slots, key=lambda x: x[1])
+            time_slots = list(zip(TIME_SLOT_NAMES, time_slot_counts))
+            primary_slot = max(time_slots, key=itemgetter(1))
 
             if primary_slot[0] == "深夜":
                 time_advice = "熬夜看视频可能会影响健康，建议调整作息哦！"
@@ -999,9 +1084,8 @@ async def get_time_slots(
         }
 
         # 更新缓存
-        from .title_pattern_discovery import pattern_cache
         print(f"更新 {target_year} 年的时段分析数据缓存")
-        pattern_cache.cache_patterns(table_name, 'time_slots', response)
+        background_tasks.add_task(save_history_summary, table_name, 'time_slots', response)
 
         return response
 
@@ -1013,12 +1097,14 @@ async def get_time_slots(
 
 @router.get("/continuity", summary="获取观看连续性分析")
 async def get_viewing_continuity(
+    background_tasks: BackgroundTasks,
     year: Optional[int] = Query(None, description="要分析的年份，不传则使用当前年份"),
     use_cache: bool = Query(True, description="是否使用缓存，默认为True。如果为False则重新分析数据")
 ):
     """获取观看连续性分析
 
     Args:
+        background_tasks: 后台任务，用于在响应返回后写入缓存
         year: 要分析的年份，不传则使用当前年份
         use_cache: 是否使用缓存，默认为True。如果为False则重新分析数据
 
@@ -1036,9 +1122,8 @@ async def get_viewing_continuity(
 
         # 如果启用缓存，尝试从缓存获取
         if use_cache:
-            from .title_pattern_discovery import pattern_cache
-            cached_response = pattern_cache.get_cached_patterns(table_name, 'viewing_continuity')
-            if cached_response:
+            cached_response = load_cached_response(cursor, table_name, 'viewing_continuity')
+            if cached_response is not None:
                 print(f"从缓存获取 {target_year} 年的观看连续性分析数据")
                 return cached_response
 
@@ -1062,9 +1147,8 @@ async def get_viewing_continuity(
         }
 
         # 更新缓存
-        from .title_pattern_discovery import pattern_cache
         print(f"更新 {target_year} 年的观看连续性分析数据缓存")
-        pattern_cache.cache_patterns(table_name, 'viewing_continuity', response)
+        background_tasks.add_task(save_history_summary, table_name, 'viewing_continuity', response)
 
         return response
 
@@ -1114,10 +1198,10 @@ def analyze_viewing_details(cursor, table_name: str) -> dict:
     """)
     category_stats = [
         {
-            "category": row[0],
-            "view_count": row[1],
-            "watch_hours": round((row[2] or 0) / 3600, 1)
-        } for row in cursor.fetchall()
+            "category": category,
+            "view_count": view_count,
+            "watch_hours": round((total_progress or 0) / 3600, 1)
+        } for category, view_count, total_progress in cursor
     ]
     
     # 4. 年度挚爱UP主
@@ -1135,11 +1219,11 @@ def analyze_viewing_details(cursor, table_name: str) -> dict:
     """)
     favorite_up_stats = [
         {
-            "mid": row[0],
-            "name": row[1],
-            "view_count": row[2],
-            "watch_hours": round((row[3] or 0) / 3600, 1)
-        } for row in cursor.fetchall()
+            "mid": mid,
+            "name": name,
+            "view_count": view_count,
+            "watch_hours": round((total_progress or 0) / 3600, 1)
+        } for mid, name, view_count, total_progress in cursor
     ]
     
     # 5. 寻找深夜观看记录
@@ -1202,14 +1286,14 @@ def analyze_viewing_details(cursor, table_name: str) -> dict:
     
     late_night_views = [
         {
-            "date": row[0],
-            "time": row[1],
-            "author": row[2],
-            "title": row[3],
-            "hour": int(row[4]),
-            "minute": row[5],
-            "hour_with_minute": float(row[6])
-        } for row in cursor.fetchall()
+            "date": view_date,
+            "time": view_time,
+            "author": author,
+            "title": title,
+            "hour": int(hour),
+            "minute": minute,
+            "hour_with_minute": float(hour_with_minute)
+        } for view_date, view_time, author, title, hour, minute, hour_with_minute in cursor
     ]
     
     # 清理临时表
@@ -1217,23 +1301,30 @@ def analyze_viewing_details(cursor, table_name: str) -> dict:
     cursor.execute("DROP TABLE IF EXISTS temp_latest_per_day")
     
     # 6. 各时间段的活跃天数百分比
+    # 小时只计算一次并转为整数，避免逐行多次格式化和字符串比较
     cursor.execute(f"""
-        SELECT 
-            CASE 
-                WHEN strftime('%H', datetime(view_at + 28800, 'unixepoch')) BETWEEN '05' AND '11' THEN '上午'
-                WHEN strftime('%H', datetime(view_at + 28800, 'unixepoch')) BETWEEN '12' AND '17' THEN '下午'
-                WHEN strftime('%H', datetime(view_at + 28800, 'unixepoch')) BETWEEN '18' AND '22' THEN '晚上'
+        WITH hourly AS (
+            SELECT
+                CAST(strftime('%H', view_at + 28800, 'unixepoch') AS INTEGER) as h,
+                date(view_at + 28800, 'unixepoch') as view_date
+            FROM {table_name}
+        )
+        SELECT
+            CASE
+                WHEN h BETWEEN 5 AND 11 THEN '上午'
+                WHEN h BETWEEN 12 AND 17 THEN '下午'
+                WHEN h BETWEEN 18 AND 22 THEN '晚上'
                 ELSE '深夜'
             END as time_slot,
-            COUNT(DISTINCT strftime('%Y-%m-%d', datetime(view_at + 28800, 'unixepoch'))) as active_days
-        FROM {table_name}
+            COUNT(DISTINCT view_date) as active_days
+        FROM hourly
         GROUP BY time_slot
     """)
     time_slot_days = {}
-    for row in cursor.fetchall():
-        time_slot_days[row[0]] = {
-            "days": row[1],
-            "percentage": round(row[1] / total_days * 100, 1) if total_days > 0 else 0
+    for time_slot, active_days in cursor:
+        time_slot_days[time_slot] = {
+            "days": active_days,
+            "percentage": round(active_days / total_days * 100, 1) if total_days > 0 else 0
         }
     
     # 7. 查询最常用的设备信息（如果有）
@@ -1252,7 +1343,7 @@ def analyze_viewing_details(cursor, table_name: str) -> dict:
         ORDER BY count DESC
         LIMIT 3
     """)
-    devices = [{"name": row[0], "count": row[1]} for row in cursor.fetchall()]
+    devices = [{"name": platform, "count": count} for platform, count in cursor]
         
     return {
         "total_watch_hours": total_hours,
@@ -1310,12 +1401,14 @@ def generate_viewing_report(viewing_details: dict) -> dict:
 
 @router.get("/viewing/", summary="获取观看行为数据分析")
 async def get_viewing_details(
+    background_tasks: BackgroundTasks,
     year: Optional[int] = Query(None, description="要分析的年份，不传则使用当前年份"),
     use_cache: bool = Query(True, description="是否使用缓存，默认为True。如果为False则重新分析数据")
 ):
     """获取观看行为数据分析
     
     Args:
+        background_tasks: 后台任务，用于在响应返回后写入缓存
         year: 要分析的年份，不传则使用当前年份
         use_cache: 是否使用缓存，默认为True。如果为False则重新分析数据
     
@@ -1333,9 +1426,8 @@ async def get_viewing_details(
         
         # 如果启用缓存，尝试从缓存获取完整响应
         if use_cache:
-            from .title_pattern_discovery import pattern_cache
-            cached_response = pattern_cache.get_cached_patterns(table_name, 'viewing_details')
-            if cached_response:
+            cached_response = load_cached_response(cursor, table_name, 'viewing_details')
+            if cached_response is not None:
                 print(f"从缓存获取 {target_year} 年的观看行为分析数据")
                 return cached_response
         
@@ -1359,23 +1451,27 @@ async def get_viewing_details(
         }
         
         # 无论是否启用缓存，都更新缓存数据
-        from .title_pattern_discovery import pattern_cache
         print(f"更新 {target_year} 年的观看行为分析数据缓存")
-        pattern_cache.cache_patterns(table_name, 'viewing_details', response)
+        background_tasks.add_task(save_history_summary, table_name, 'viewing_details', response)
         
         return response
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if conn:
+            conn.close()
 
 @router.get("/watch-counts", summary="获取重复观看分析")
 async def get_viewing_watch_counts(
+    background_tasks: BackgroundTasks,
     year: Optional[int] = Query(None, description="要分析的年份，不传则使用当前年份"),
     use_cache: bool = Query(True, description="是否使用缓存，默认为True。如果为False则重新分析数据")
 ):
     """获取用户重复观看分析
 
     Args:
+        background_tasks: 后台任务，用于在响应返回后写入缓存
         year: 要分析的年份，不传则使用当前年份
         use_cache: 是否使用缓存，默认为True。如果为False则重新分析数据
 
@@ -1393,9 +1489,8 @@ async def get_viewing_watch_counts(
 
         # 如果启用缓存，尝试从缓存获取
         if use_cache:
-            from .title_pattern_discovery import pattern_cache
-            cached_response = pattern_cache.get_cached_patterns(table_name, 'watch_counts')
-            if cached_response:
+            cached_response = load_cached_response(cursor, table_name, 'watch_counts')
+            if cached_response is not None:
                 print(f"从缓存获取 {target_year} 年的重复观看分析数据")
                 return cached_response
 
@@ -1419,9 +1514,8 @@ async def get_viewing_watch_counts(
         }
 
         # 更新缓存
-        from .title_pattern_discovery import pattern_cache
         print(f"更新 {target_year} 年的重复观看分析数据缓存")
-        pattern_cache.cache_patterns(table_name, 'watch_counts', response)
+        background_tasks.add_task(save_history_summary, table_name, 'watch_counts', response)
 
         return response
 
@@ -1433,12 +1527,14 @@ async def get_viewing_watch_counts(
 
 @router.get("/completion-rates", summary="获取视频完成率分析")
 async def get_viewing_completion_rates(
+    background_tasks: BackgroundTasks,
     year: Optional[int] = Query(None, description="要分析的年份，不传则使用当前年份"),
     use_cache: bool = Query(True, description="是否使用缓存，默认为True。如果为False则重新分析数据")
 ):
     """获取用户视频完成率分析
 
     Args:
+        background_tasks: 后台任务，用于在响应返回后写入缓存
         year: 要分析的年份，不传则使用当前年份
         use_cache: 是否使用缓存，默认为True。如果为False则重新分析数据
 
@@ -1456,9 +1552,8 @@ async def get_viewing_completion_rates(
 
         # 如果启用缓存，尝试从缓存获取
         if use_cache:
-            from .title_pattern_discovery import pattern_cache
-            cached_response = pattern_cache.get_cached_patterns(table_name, 'completion_rates')
-            if cached_response:
+            cached_response = load_cached_response(cursor, table_name, 'completion_rates')
+            if cached_response is not None:
                 print(f"从缓存获取 {target_year} 年的视频完成率分析数据")
                 return cached_response
 
@@ -1482,9 +1577,8 @@ async def get_viewing_completion_rates(
         }
 
         # 更新缓存
-        from .title_pattern_discovery import pattern_cache
         print(f"更新 {target_year} 年的视频完成率分析数据缓存")
-        pattern_cache.cache_patterns(table_name, 'completion_rates', response)
+        background_tasks.add_task(save_history_summary, table_name, 'completion_rates', response)
 
         return response
 
@@ -1496,32 +1590,17 @@ async def get_viewing_completion_rates(
 
 def analyze_author_completion_rates(cursor, table_name: str) -> dict:
     """专门分析UP主完成率数据，使用智能综合评分算法"""
-    # 获取表结构
-    cursor.execute(f"PRAGMA table_info({table_name})")
-    columns = {col[1]: idx for idx, col in enumerate(cursor.fetchall())}
-
-    # 确保必要的列存在
-    required_columns = ['duration', 'progress', 'author_name', 'author_mid']
-    for col in required_columns:
-        if col not in columns:
-            raise ValueError(f"Required column '{col}' not found in table {table_name}")
-
-    # 获取所有历史记录
-    cursor.execute(f"SELECT * FROM {table_name}")
-    histories = cursor.fetchall()
-
     author_stats = {}
 
-    for history in histories:
-        # 获取并转换数据类型
-        try:
-            duration = float(history[columns['duration']]) if history[columns['duration']] else 0
-            progress = float(history[columns['progress']]) if history[columns['progress']] else 0
-            author_name = history[columns['author_name']]
-            author_mid = history[columns['author_mid']]
-        except (ValueError, TypeError):
-            continue
-
+    # 只读取需要的列，在SQL中把时长/进度统一转换为数值（文本形式的数值由CAST转换，空值按0处理）、
+    # 过滤掉缺少UP主信息的记录，并直接迭代游标逐行处理
+    cursor.execute(f"""
+        SELECT CAST(IFNULL(duration, 0) AS REAL), CAST(IFNULL(progress, 0) AS REAL), author_name, author_mid
+        FROM {table_name}
+        WHERE author_name IS NOT NULL AND author_name != ''
+          AND author_mid IS NOT NULL AND author_mid NOT IN (0, '')
+    """)
+    for duration, progress, author_name, author_mid in cursor:
         # 计算完成率
         if progress == -1:
             completion_rate = 100
@@ -1529,19 +1608,18 @@ def analyze_author_completion_rates(cursor, table_name: str) -> dict:
             completion_rate = (progress / duration * 100) if duration > 0 else 0
 
         # UP主统计
-        if author_name and author_mid:
-            if author_name not in author_stats:
-                author_stats[author_name] = {
-                    "author_mid": author_mid,
-                    "video_count": 0,
-                    "total_completion": 0,
-                    "fully_watched": 0
-                }
-            stats = author_stats[author_name]
-            stats["video_count"] += 1
-            stats["total_completion"] += completion_rate
-            if completion_rate >= 90:
-                stats["fully_watched"] += 1
+        if author_name not in author_stats:
+            author_stats[author_name] = {
+                "author_mid": author_mid,
+                "video_count": 0,
+                "total_completion": 0,
+                "fully_watched": 0
+            }
+        stats = author_stats[author_name]
+        stats["video_count"] += 1
+        stats["total_completion"] += completion_rate
+        if completion_rate >= 90:
+            stats["fully_watched"] += 1
 
     # 计算UP主平均完成率和完整观看率，并按观看数量筛选
     filtered_authors = {}
@@ -1563,8 +1641,6 @@ def analyze_author_completion_rates(cursor, table_name: str) -> dict:
 
 def calculate_comprehensive_author_scores(authors_data: dict) -> dict:
     """计算UP主综合评分并分类"""
-    import math
-    
     if not authors_data:
         return {
             "most_watched_authors": {},
@@ -1700,12 +1776,14 @@ def generate_author_completion_insights(author_data: dict) -> dict:
 
 @router.get("/author-completion", summary="获取UP主完成率分析")
 async def get_viewing_author_completion(
+    background_tasks: BackgroundTasks,
     year: Optional[int] = Query(None, description="要分析的年份，不传则使用当前年份"),
     use_cache: bool = Query(True, description="是否使用缓存，默认为True。如果为False则重新分析数据")
 ):
     """获取UP主完成率分析
 
     Args:
+        background_tasks: 后台任务，用于在响应返回后写入缓存
         year: 要分析的年份，不传则使用当前年份
         use_cache: 是否使用缓存，默认为True。如果为False则重新分析数据
 
@@ -1723,9 +1801,8 @@ async def get_viewing_author_completion(
 
         # 如果启用缓存，尝试从缓存获取
         if use_cache:
-            from .title_pattern_discovery import pattern_cache
-            cached_response = pattern_cache.get_cached_patterns(table_name, 'author_completion')
-            if cached_response:
+            cached_response = load_cached_response(cursor, table_name, 'author_completion')
+            if cached_response is not None:
                 print(f"从缓存获取 {target_year} 年的UP主完成率分析数据")
                 return cached_response
 
@@ -1749,9 +1826,8 @@ async def get_viewing_author_completion(
         }
 
         # 更新缓存
-        from .title_pattern_discovery import pattern_cache
         print(f"更新 {target_year} 年的UP主完成率分析数据缓存")
-        pattern_cache.cache_patterns(table_name, 'author_completion', response)
+        background_tasks.add_task(save_history_summary, table_name, 'author_completion', response)
 
         return response
 
@@ -1763,32 +1839,17 @@ async def get_viewing_author_completion(
 
 def analyze_tag_analysis(cursor, table_name: str) -> dict:
     """专门分析标签数据，包括分布和完成率"""
-    # 获取表结构
-    cursor.execute(f"PRAGMA table_info({table_name})")
-    columns = {col[1]: idx for idx, col in enumerate(cursor.fetchall())}
-
-    # 确保必要的列存在
-    required_columns = ['duration', 'progress', 'tag_name']
-    for col in required_columns:
-        if col not in columns:
-            raise ValueError(f"Required column '{col}' not found in table {table_name}")
-
-    # 获取所有历史记录
-    cursor.execute(f"SELECT * FROM {table_name}")
-    histories = cursor.fetchall()
-
     tag_stats = {}
     tag_distribution = {}
 
-    for history in histories:
-        # 获取并转换数据类型
-        try:
-            duration = float(history[columns['duration']]) if history[columns['duration']] else 0
-            progress = float(history[columns['progress']]) if history[columns['progress']] else 0
-            tag_name = history[columns['tag_name']]
-        except (ValueError, TypeError):
-            continue
-
+    # 只读取需要的列，在SQL中把时长/进度统一转换为数值（文本形式的数值由CAST转换，空值按0处理）、
+    # 过滤掉没有标签的记录，并直接迭代游标逐行处理
+    cursor.execute(f"""
+        SELECT CAST(IFNULL(duration, 0) AS REAL), CAST(IFNULL(progress, 0) AS REAL), tag_name
+        FROM {table_name}
+        WHERE tag_name IS NOT NULL AND tag_name != ''
+    """)
+    for duration, progress, tag_name in cursor:
         # 计算完成率
         if progress == -1:
             completion_rate = 100
@@ -1796,21 +1857,20 @@ def analyze_tag_analysis(cursor, table_name: str) -> dict:
             completion_rate = (progress / duration * 100) if duration > 0 else 0
 
         # 标签分布统计
-        if tag_name:
-            tag_distribution[tag_name] = tag_distribution.get(tag_name, 0) + 1
-
-            # 标签完成率统计
-            if tag_name not in tag_stats:
-                tag_stats[tag_name] = {
-                    "video_count": 0,
-                    "total_completion": 0,
-                    "fully_watched": 0
-                }
-            stats = tag_stats[tag_name]
-            stats["video_count"] += 1
-            stats["total_completion"] += completion_rate
-            if completion_rate >= 90:
-                stats["fully_watched"] += 1
+        tag_distribution[tag_name] = tag_distribution.get(tag_name, 0) + 1
+
+        # 标签完成率统计
+        if tag_name not in tag_stats:
+            tag_stats[tag_name] = {
+                "video_count": 0,
+                "total_completion": 0,
+                "fully_watched": 0
+            }
+        stats = tag_stats[tag_name]
+        stats["video_count"] += 1
+        stats["total_completion"] += completion_rate
+        if completion_rate >= 90:
+            stats["fully_watched"] += 1
 
     # 计算标签平均完成率和完整观看率，并按观看数量筛选
     filtered_tags = {}
@@ -1872,12 +1932,14 @@ def generate_tag_analysis_insights(tag_data: dict) -> dict:
 
 @router.get("/tag-analysis", summary="获取标签分析")
 async def get_viewing_tag_analysis(
+    background_tasks: BackgroundTasks,
     year: Optional[int] = Query(None, description="要分析的年份，不传则使用当前年份"),
     use_cache: bool = Query(True, description="是否使用缓存，默认为True。如果为False则重新分析数据")
 ):
     """获取标签分析
 
     Args:
+        background_tasks: 后台任务，用于在响应返回后写入缓存
         year: 要分析的年份，不传则使用当前年份
         use_cache: 是否使用缓存，默认为True。如果为False则重新分析数据
 
@@ -1895,9 +1957,8 @@ async def get_viewing_tag_analysis(
 
         # 如果启用缓存，尝试从缓存获取
         if use_cache:
-            from .title_pattern_discovery import pattern_cache
-            cached_response = pattern_cache.get_cached_patterns(table_name, 'tag_analysis')
-            if cached_response:
+            cached_response = load_cached_response(cursor, table_name, 'tag_analysis')
+            if cached_response is not None:
                 print(f"从缓存获取 {target_year} 年的标签分析数据")
                 return cached_response
 
@@ -1922,9 +1983,8 @@ async def get_viewing_tag_analysis(
         }
 
         # 更新缓存
-        from .title_pattern_discovery import pattern_cache
         print(f"更新 {target_year} 年的标签分析数据缓存")
-        pattern_cache.cache_patterns(table_name, 'tag_analysis', response)
+        background_tasks.add_task(save_history_summary, table_name, 'tag_analysis', response)
 
         return response
 
@@ -1934,108 +1994,86 @@ async def get_viewing_tag_analysis(
         if conn:
             conn.close()
 
-def analyze_duration_analysis(cursor, table_name: str) -> dict:
-    """专门分析视频时长数据"""
-    # 获取表结构
-    cursor.execute(f"PRAGMA table_info({table_name})")
-    columns = {col[1]: idx for idx, col in enumerate(cursor.fetchall())}
-
-    # 确保必要的列存在
-    required_columns = ['duration', 'view_at']
-    for col in required_columns:
-        if col not in columns:
-            raise ValueError(f"Required column '{col}' not found in table {table_name}")
-
-    # 获取所有历史记录
-    cursor.execute(f"SELECT * FROM {table_name}")
-    histories = cursor.fetchall()
-
-    print(f"Debug: 总共获取到 {len(histories)} 条历史记录")
-    if len(histories) > 0:
-        print(f"Debug: 第一条记录示例: {histories[0]}")
-        print(f"Debug: 列映射: {columns}")
-
-    # 时段分类
-    time_periods = {
-        '凌晨': {'start': 0, 'end': 6},
-        '上午': {'start': 6, 'end': 12},
-        '下午': {'start': 12, 'end': 18},
-        '晚上': {'start': 18, 'end': 24}
-    }
-
-    # 初始化时长相关性数据
-    duration_correlation = {}
-    for period in time_periods.keys():
-        duration_correlation[period] = {
-            '短视频': {'video_count': 0, 'total_duration': 0, 'avg_duration': 0},
-            '中等视频': {'video_count': 0, 'total_duration': 0, 'avg_duration': 0},
-            '长视频': {'video_count': 0, 'total_duration': 0, 'avg_duration': 0}
-        }
-
-    processed_count = 0
-    valid_count = 0
-
-    for history in histories:
-        processed_count += 1
-        try:
-            duration = float(history[columns['duration']]) if history[columns['duration']] else 0
-            view_at = history[columns['view_at']]
-
-            if not view_at or duration <= 0:
-                if processed_count <= 5:  # 只打印前5条的调试信息
-                    print(f"Debug: 跳过记录 {processed_count}: view_at={view_at}, duration={duration}")
-                continue
-
-            # 解析观看时间 - view_at 是 Unix 时间戳
-            from datetime import datetime
-            try:
-                # view_at 是 Unix 时间戳，需要转换为 datetime 对象
-                view_time = datetime.fromtimestamp(int(view_at))
-                hour = view_time.hour
-            except (ValueError, TypeError, OSError):
-                continue
+# 服务器本地时区相对UTC的偏移（秒），进程启动时计算一次
+LOCAL_TZ_OFFSET = int(datetime.now().astimezone().utcoffset().total_seconds())
 
-            # 确定时段
-            period = None
-            for p, time_range in time_periods.items():
-                if time_range['start'] <= hour < time_range['end']:
-                    period = p
-                    break
+# 时长分析的时段与时长类型，HOUR_TO_PERIOD_IDX 按小时直接查表得到时段下标
+DURATION_PERIODS = ('凌晨', '上午', '下午', '晚上')
+HOUR_TO_PERIOD_IDX = tuple(idx for idx in range(len(DURATION_PERIODS)) for _ in range(6))
+DURATION_TYPES = ('短视频', '中等视频', '长视频')
 
-            if not period:
-                continue
+# 已确认存在 (view_at, duration) 覆盖索引的表
+_view_duration_indexed_tables = set()
 
-            # 确定时长类型
-            if duration < 300:  # 5分钟以下
-                duration_type = '短视频'
-            elif duration < 1200:  # 20分钟以下
-                duration_type = '中等视频'
-            else:
-                duration_type = '长视频'
+def _ensure_view_duration_index(cursor, table_name: str) -> None:
+    """为已有的历史记录表补建 (view_at, duration) 覆盖索引，使时长分析只需扫描索引"""
+    if table_name in _view_duration_indexed_tables:
+        return
+    try:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table_name}_view_duration ON {table_name} (view_at, duration)")
+        _view_duration_indexed_tables.add(table_name)
+    except sqlite3.Error as e:
+        print(f"创建时长分析索引失败: {e}")
 
-            # 更新统计
-            stats = duration_correlation[period][duration_type]
-            stats['video_count'] += 1
-            stats['total_duration'] += duration
-            valid_count += 1
+def _empty_duration_correlation() -> dict:
+    """构建全零的时长相关性数据（时段 x 时长类型）"""
+    return {
+        period: {
+            duration_type: {'video_count': 0, 'total_duration': 0, 'avg_duration': 0}
+            for duration_type in DURATION_TYPES
+        }
+        for period in DURATION_PERIODS
+    }
 
-            if valid_count <= 5:  # 只打印前5条有效记录的调试信息
-                print(f"Debug: 有效记录 {valid_count}: period={period}, duration_type={duration_type}, duration={duration}")
+def analyze_duration_analysis(cursor, table_name: str) -> dict:
+    """专门分析视频时长数据"""
+    # 确保必要的列存在
+    _require_columns(cursor, table_name, ['duration', 'view_at'])
 
-        except (ValueError, TypeError):
-            if processed_count <= 5:
-                print(f"Debug: 数据转换失败，记录 {processed_count}")
-            continue
+    # 空表直接返回全零结构，跳过建索引和分组统计
+    if cursor.execute(f"SELECT 1 FROM {table_name} LIMIT 1").fetchone() is None:
+        return _empty_duration_correlation()
 
-    # 计算平均时长
-    for period in duration_correlation:
-        for duration_type in duration_correlation[period]:
-            stats = duration_correlation[period][duration_type]
-            if stats['video_count'] > 0:
-                stats['avg_duration'] = stats['total_duration'] / stats['video_count']
+    _ensure_view_duration_index(cursor, table_name)
 
-    print(f"Debug: 处理完成 - 总记录数: {processed_count}, 有效记录数: {valid_count}")
-    print(f"Debug: 最终统计结果: {duration_correlation}")
+    # 在SQL中按小时和时长类型分组统计，再通过查表把小时归并到时段。
+    # 小时按服务器本地时区计算，用启动时确定的UTC偏移做整数运算，避免 'localtime' 逐行查询时区。
+    # 时长与其他分析一样用CAST统一转换为数值（文本形式的数值同样参与统计）
+    cursor.execute(f"""
+        SELECT
+            ((CAST(view_at AS INTEGER) + ?) / 3600) % 24 as hour,
+            CASE
+                WHEN CAST(duration AS REAL) < 300 THEN 0
+                WHEN CAST(duration AS REAL) < 1200 THEN 1
+                ELSE 2
+            END as duration_idx,
+            COUNT(*) as video_count,
+            TOTAL(CAST(duration AS REAL)) as total_duration
+        FROM {table_name}
+        WHERE CAST(IFNULL(duration, 0) AS REAL) > 0
+          AND view_at IS NOT NULL AND view_at != 0
+        GROUP BY hour, duration_idx
+    """, (LOCAL_TZ_OFFSET,))
+
+    # 先累加到 时段 x 时长类型 的二维计数数组，最后再构建嵌套字典
+    counts = [[0] * len(DURATION_TYPES) for _ in DURATION_PERIODS]
+    totals = [[0] * len(DURATION_TYPES) for _ in DURATION_PERIODS]
+    for hour, duration_idx, video_count, total_duration in cursor:
+        period_idx = HOUR_TO_PERIOD_IDX[hour]
+        counts[period_idx][duration_idx] += video_count
+        totals[period_idx][duration_idx] += total_duration
+
+    # 构建结果并计算平均时长
+    duration_correlation = {}
+    for period, period_counts, period_totals in zip(DURATION_PERIODS, counts, totals):
+        duration_correlation[period] = {
+            duration_type: {
+                'video_count': video_count,
+                'total_duration': total_duration,
+                'avg_duration': total_duration / video_count if video_count > 0 else 0
+            }
+            for duration_type, video_count, total_duration in zip(DURATION_TYPES, period_counts, period_totals)
+        }
 
     return duration_correlation
 
@@ -2047,29 +2085,26 @@ def generate_duration_analysis_insights(duration_data: dict) -> dict:
         # 计算总体时长偏好
         total_counts = {'短视频': 0, '中等视频': 0, '长视频': 0}
 
-        for period in duration_data:
-            for duration_type in duration_data[period]:
-                total_counts[duration_type] += duration_data[period][duration_type]['video_count']
-
-        if sum(total_counts.values()) > 0:
+        # 单次遍历同时累计各时长类型总数，并找出最活跃的时段和对应的时长偏好
+        max_period_count = 0
+        max_period = None
+        max_period_type = None
+        for period, type_stats in duration_data.items():
+            for duration_type, stats in type_stats.items():
+                count = stats['video_count']
+                total_counts[duration_type] += count
+                if count > max_period_count:
+                    max_period_count = count
+                    max_period = period
+                    max_period_type = duration_type
+
+        total_videos = sum(total_counts.values())
+        if total_videos > 0:
             # 找出最喜欢的时长类型
-            preferred_type = max(total_counts.items(), key=lambda x: x[1])
-            total_videos = sum(total_counts.values())
+            preferred_type_name = max(total_counts, key=total_counts.__getitem__)
+            preferred_type = (preferred_type_name, total_counts[preferred_type_name])
             preference_rate = round(preferred_type[1] / total_videos * 100, 1)
 
-            # 找出最活跃的时段和对应的时长偏好
-            max_period_count = 0
-            max_period = None
-            max_period_type = None
-
-            for period in duration_data:
-                for duration_type in duration_data[period]:
-                    count = duration_data[period][duration_type]['video_count']
-                    if count > max_period_count:
-                        max_period_count = count
-                        max_period = period
-                        max_period_type = duration_type
-
             insights["duration_preference"] = (
                 f"你最喜欢观看{preferred_type[0]}，占总观看量的{preference_rate}%。"
                 f"特别是在{max_period}时段，你更偏向于观看{max_period_type}。"
@@ -2083,12 +2118,14 @@ def generate_duration_analysis_insights(duration_data: dict) -> dict:
 
 @router.get("/duration-analysis", summary="获取视频时长分析")
 async def get_viewing_duration_analysis(
+    background_tasks: BackgroundTasks,
     year: Optional[int] = Query(None, description="要分析的年份，不传则使用当前年份"),
     use_cache: bool = Query(True, description="是否使用缓存，默认为True。如果为False则重新分析数据")
 ):
     """获取视频时长分析
 
     Args:
+        background_tasks: 后台任务，用于在响应返回后写入缓存
         year: 要分析的年份，不传则使用当前年份
         use_cache: 是否使用缓存，默认为True。如果为False则重新分析数据
 
@@ -2106,9 +2143,8 @@ async def get_viewing_duration_analysis(
 
         # 如果启用缓存，尝试从缓存获取
         if use_cache:
-            from .title_pattern_discovery import pattern_cache
-            cached_response = pattern_cache.get_cached_patterns(table_name, 'duration_analysis')
-            if cached_response:
+            cached_response = load_cached_response(cursor, table_name, 'duration_analysis')
+            if cached_response is not None:
                 print(f"从缓存获取 {target_year} 年的视频时长分析数据")
                 return cached_response
 
@@ -2132,9 +2168,8 @@ async def get_viewing_duration_analysis(
         }
 
         # 更新缓存
-        from .title_pattern_discovery import pattern_cache
         print(f"更新 {target_year} 年的视频时长分析数据缓存")
-        pattern_cache.cache_patterns(table_name, 'duration_analysis', response)
+        background_tasks.add_task(save_history_summary, table_name, 'duration_analysis', response)
 
         return response
 
@@ -2143,3 +2178,57 @@ async def get_viewing_duration_analysis(
     finally:
         if conn:
             conn.close()
+
+async def _refresh_history_summary(year: int) -> None:
+    """依次重新计算指定年份的全部分析结果，并写入汇总表"""
+    endpoints = (
+        get_monthly_stats,
+        get_weekly_stats,
+        get_time_slots,
+        get_viewing_continuity,
+        get_viewing_details,
+        get_viewing_watch_counts,
+        get_viewing_completion_rates,
+        get_viewing_author_completion,
+        get_viewing_tag_analysis,
+        get_viewing_duration_analysis
+    )
+    for endpoint in endpoints:
+        tasks = BackgroundTasks()
+        try:
+            await endpoint(background_tasks=tasks, year=year, use_cache=False)
+            await tasks()
+        except HTTPException as e:
+            print(f"刷新 {year} 年的分析汇总数据时出错({endpoint.__name__}): {e.detail}")
+
+def refresh_history_summary(year: int) -> None:
+    """重新计算指定年份的全部分析结果
+
+    各分析接口内部都是阻塞的sqlite查询，因此本函数定义为同步函数：作为后台任务时由FastAPI放到线程池执行，
+    在独立的事件循环中依次调用各接口，不会阻塞主事件循环
+    """
+    asyncio.run(_refresh_history_summary(year))
+
+@router.post("/summary/refresh", summary="后台刷新分析汇总数据")
+async def refresh_viewing_summary(
+    background_tasks: BackgroundTasks,
+    year: Optional[int] = Query(None, description="要刷新的年份，不传则使用当前年份")
+):
+    """在后台重新计算并物化指定年份的全部观看分析结果
+
+    Args:
+        background_tasks: 后台任务
+        year: 要刷新的年份，不传则使用当前年份
+
+    Returns:
+        dict: 刷新任务的提交结果
+    """
+    table_name, target_year, available_years = validate_year_and_get_table(year)
+    if table_name is None:
+        return available_years  # 这里是错误响应
+
+    background_tasks.add_task(refresh_history_summary, target_year)
+    return {
+        "status": "success",
+        "message": f"已开始在后台刷新 {target_year} 年的分析汇总数据"
+    }
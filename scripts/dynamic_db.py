@@ -1,6 +1,7 @@
 import os
 import json
 import sqlite3
+import threading
 from datetime import datetime
 from typing import Iterable, Optional, Tuple, Dict, Any, List
 from loguru import logger
@@ -60,6 +61,35 @@ def _ensure_schema(conn: sqlite3.Connection) -> None:
         """
     )
 
+    # 按UP分页列出动态时，WHERE host_mid 与 ORDER BY 均可走该索引
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_dynamic_core_host_pub
+            ON dynamic_core(host_mid, publish_ts DESC, fetch_time DESC)
+        """
+    )
+
+    # 按UP汇总的动态统计，随保存动态同步刷新，避免列出UP时对 dynamic_core 全表分组
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS dynamic_host_stats (
+            host_mid TEXT PRIMARY KEY,
+            item_count INTEGER NOT NULL,
+            last_publish_ts INTEGER,
+            last_fetch_time INTEGER
+        )
+        """
+    )
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_dynamic_host_stats_order
+            ON dynamic_host_stats(last_publish_ts DESC, item_count DESC)
+        """
+    )
+    # 旧数据库首次升级时从 dynamic_core 回填
+    if cursor.execute("SELECT 1 FROM dynamic_host_stats LIMIT 1").fetchone() is None:
+        cursor.execute(_REBUILD_HOST_STATS_SQL)
+
     # 作者信息
     cursor.execute(
         """
@@ -135,12 +165,22 @@ def _ensure_schema(conn: sqlite3.Connection) -> None:
     conn.commit()
 
 
+# 表结构在进程内只需确保一次；数据库文件被删除重建时会再次执行
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+
 def get_connection() -> sqlite3.Connection:
     """获取数据库连接（并自动创建表结构）"""
+    global _schema_ready
     db_path = _get_db_path()
     os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    db_exists = os.path.exists(db_path)
     conn = sqlite3.connect(db_path)
-    _ensure_schema(conn)
+    if not (_schema_ready and db_exists):
+        with _schema_lock:
+            _ensure_schema(conn)
+            _schema_ready = True
     return conn
 
 
@@ -152,14 +192,7 @@ def get_connection() -> sqlite3.Connection:
 
 def dynamic_core_exists(conn: sqlite3.Connection, host_mid: int, id_str: str) -> bool:
     """判断某条动态是否已存在于核心表中"""
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        SELECT 1 FROM dynamic_core WHERE host_mid = ? AND id_str = ? LIMIT 1
-        """,
-        (str(host_mid), str(id_str)),
-    )
-    return cursor.fetchone() is not None
+    return conn.execute(_DYNAMIC_CORE_EXISTS_SQL, (str(host_mid), str(id_str))).fetchone() is not None
 
 
 def _to_int(value: Any) -> Optional[int]:
@@ -171,34 +204,108 @@ def _to_int(value: Any) -> Optional[int]:
         return None
 
 
-def save_normalized_dynamic_item(conn: sqlite3.Connection, host_mid: int, item: Dict[str, Any]) -> None:
-    """将动态条目按多表结构保存/更新
-
-    - 核心信息 dynamic_core
-    - 作者 dynamic_author
-    - 统计 dynamic_stat
-    - 正文 dynamic_desc
-    - 话题 dynamic_topic
-    - major 分类型：archive / draw / article / opus
+_UPSERT_CORE_SQL = """
+    INSERT INTO dynamic_core (host_mid, id_str, type, visible, publish_ts, comment_id_str, comment_type, rid_str,
+                              txt, author_name, bvid, title, cover, desc, article_title, article_covers,
+                              opus_title, opus_summary_text, media_locals, media_count, live_media_locals, live_media_count,
+                              fetch_time)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(host_mid, id_str) DO UPDATE SET
+        type = excluded.type,
+        visible = excluded.visible,
+        publish_ts = excluded.publish_ts,
+        comment_id_str = excluded.comment_id_str,
+        comment_type = excluded.comment_type,
+        rid_str = excluded.rid_str,
+        txt = excluded.txt,
+        author_name = excluded.author_name,
+        bvid = excluded.bvid,
+        title = excluded.title,
+        cover = excluded.cover,
+        desc = excluded.desc,
+        article_title = excluded.article_title,
+        article_covers = excluded.article_covers,
+        opus_title = excluded.opus_title,
+        opus_summary_text = excluded.opus_summary_text,
+        media_locals = excluded.media_locals,
+        media_count = excluded.media_count,
+        live_media_locals = excluded.live_media_locals,
+        live_media_count = excluded.live_media_count,
+        fetch_time = excluded.fetch_time
+"""
+
+_UPSERT_AUTHOR_SQL = """
+    INSERT INTO dynamic_author (host_mid, id_str, author_mid, author_name, face)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(host_mid, id_str) DO UPDATE SET
+        author_mid = excluded.author_mid,
+        author_name = excluded.author_name,
+        face = excluded.face
+"""
+
+_UPSERT_STAT_SQL = """
+    INSERT INTO dynamic_stat (host_mid, id_str, like_count, comment_count, repost_count, view_count)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(host_mid, id_str) DO UPDATE SET
+        like_count = excluded.like_count,
+        comment_count = excluded.comment_count,
+        repost_count = excluded.repost_count,
+        view_count = excluded.view_count
+"""
+
+
+# SQL 文本在模块加载时一次性生成，保证每次执行的是同一字符串，命中连接的语句缓存
+_REFRESH_HOST_STATS_TEMPLATE = """
+    INSERT INTO dynamic_host_stats (host_mid, item_count, last_publish_ts, last_fetch_time)
+    SELECT host_mid, COUNT(*), MAX(publish_ts), MAX(fetch_time)
+    FROM dynamic_core
+    {where}
+    GROUP BY host_mid
+    ON CONFLICT(host_mid) DO UPDATE SET
+        item_count = excluded.item_count,
+        last_publish_ts = excluded.last_publish_ts,
+        last_fetch_time = excluded.last_fetch_time
+"""
+_REBUILD_HOST_STATS_SQL = _REFRESH_HOST_STATS_TEMPLATE.format(where="")
+_REFRESH_HOST_STATS_SQL = _REFRESH_HOST_STATS_TEMPLATE.format(where="WHERE host_mid = ?")
+
+_DYNAMIC_CORE_EXISTS_SQL = "SELECT 1 FROM dynamic_core WHERE host_mid = ? AND id_str = ? LIMIT 1"
+
+
+def _refresh_host_stats(cursor: sqlite3.Cursor, host_mid: int) -> None:
+    """按 dynamic_core 重新汇总指定UP的统计（走主键索引，只扫描该UP的动态）"""
+    cursor.execute(_REFRESH_HOST_STATS_SQL, (str(host_mid),))
+
+
+def _build_dynamic_rows(
+    host_mid: int, item: Dict[str, Any], fetch_time: int
+) -> Optional[Tuple[tuple, tuple, tuple]]:
+    """从动态条目中提取 dynamic_core / dynamic_author / dynamic_stat 三张表的行数据
+
+    缺少 id_str 时返回 None
     """
-    cursor = conn.cursor()
-    fetch_time = int(datetime.now().timestamp())
     logger.debug(f"normalize.begin host_mid={host_mid}")
-
     basic = item.get("basic", {}) if isinstance(item, dict) else {}
     modules_raw = item.get("modules")
     # 兼容 modules 既可能为对象也可能为数组
     module_author = {}
     module_stat = {}
     module_dynamic = {}
+    # 数组结构中 module_desc 的正文，作为 module_dynamic.desc 缺失时的回退
+    module_desc_text = None
     if isinstance(modules_raw, dict):
         module_author = modules_raw.get("module_author", {})
         module_stat = modules_raw.get("module_stat", {})
         module_dynamic = modules_raw.get("module_dynamic", {})
     elif isinstance(modules_raw, list):
+        # 单次遍历同时取出作者/统计/动态模块和回退正文
         for mod in modules_raw:
             if not isinstance(mod, dict):
                 continue
+            if not module_desc_text:
+                module_desc = mod.get("module_desc")
+                if isinstance(module_desc, dict):
+                    module_desc_text = module_desc.get("text")
             mtype = mod.get("module_type")
             # 新版结构将内容放在同级键名里，例如 {"module_author": {...}, "module_type": "MODULE_TYPE_AUTHOR"}
             if mtype == "MODULE_TYPE_AUTHOR" and not module_author:
@@ -215,7 +322,7 @@ def save_normalized_dynamic_item(conn: sqlite3.Connection, host_mid: int, item:
     )
     if not id_str:
         logger.warning("normalize.skip: missing id_str")
-        return
+        return None
     logger.debug(f"normalize.id id_str={id_str}")
 
     # 核心信息
@@ -225,26 +332,8 @@ def save_normalized_dynamic_item(conn: sqlite3.Connection, host_mid: int, item:
     rid_str = basic.get("rid_str")
     visible = item.get("visible")
 
-    # 作者名/头像URL
+    # 作者名
     author_name = module_author.get("name") or module_author.get("uname")
-    avatar = module_author.get("avatar")
-    if isinstance(avatar, dict):
-        fl = avatar.get("fallback_layers", {})
-        layers = fl.get("layers") if isinstance(fl, dict) else None
-        if isinstance(layers, list):
-            for layer in layers:
-                if not isinstance(layer, dict):
-                    continue
-                res = layer.get("resource", {})
-                if isinstance(res, dict):
-                    res_img = res.get("res_image", {})
-                    if isinstance(res_img, dict):
-                        img_src = res_img.get("image_src", {})
-                        if isinstance(img_src, dict):
-                            remote = img_src.get("remote", {})
-                            if isinstance(remote, dict) and remote.get("url"):
-                                author_face_url = remote.get("url")
-                                break
 
     # 文本
     txt = None
@@ -253,12 +342,8 @@ def save_normalized_dynamic_item(conn: sqlite3.Connection, host_mid: int, item:
         txt = desc_obj.get("text")
     elif isinstance(desc_obj, str):
         txt = desc_obj
-    if not txt and isinstance(modules_raw, list):
-        for mod in modules_raw:
-            if isinstance(mod, dict) and isinstance(mod.get("module_desc"), dict):
-                txt = mod.get("module_desc", {}).get("text")
-                if txt:
-                    break
+    if not txt and module_desc_text:
+        txt = module_desc_text
 
     # 媒体信息不再从单独表中获取，直接设置为空
     media_locals_joined = None
@@ -295,85 +380,42 @@ def save_normalized_dynamic_item(conn: sqlite3.Connection, host_mid: int, item:
             if isinstance(summary, dict):
                 opus_summary_text = summary.get("text")
 
-    logger.info(f"normalize.core.upsert begin host_mid={host_mid} id_str={id_str} media_count={media_count}")
-    cursor.execute(
-        """
-        INSERT INTO dynamic_core (host_mid, id_str, type, visible, publish_ts, comment_id_str, comment_type, rid_str,
-                                  txt, author_name, bvid, title, cover, desc, article_title, article_covers,
-                                  opus_title, opus_summary_text, media_locals, media_count, live_media_locals, live_media_count,
-                                  fetch_time)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ON CONFLICT(host_mid, id_str) DO UPDATE SET
-            type = excluded.type,
-            visible = excluded.visible,
-            publish_ts = excluded.publish_ts,
-            comment_id_str = excluded.comment_id_str,
-            comment_type = excluded.comment_type,
-            rid_str = excluded.rid_str,
-            txt = excluded.txt,
-            author_name = excluded.author_name,
-            bvid = excluded.bvid,
-            title = excluded.title,
-            cover = excluded.cover,
-            desc = excluded.desc,
-            article_title = excluded.article_title,
-            article_covers = excluded.article_covers,
-            opus_title = excluded.opus_title,
-            opus_summary_text = excluded.opus_summary_text,
-            media_locals = excluded.media_locals,
-            media_count = excluded.media_count,
-            live_media_locals = excluded.live_media_locals,
-            live_media_count = excluded.live_media_count,
-            fetch_time = excluded.fetch_time
-        """,
-        (
-            str(host_mid),
-            str(id_str),
-            item.get("type"),
-            1 if visible else 0 if visible is not None else None,
-            publish_ts,
-            comment_id_str,
-            comment_type,
-            rid_str,
-            txt,
-            author_name,
-            archive_bvid,
-            archive_title,
-            archive_cover,
-            archive_desc if isinstance(archive_desc, str) else None,
-            article_title,
-            article_covers,
-            opus_title,
-            opus_summary_text,
-            media_locals_joined,
-            media_count,
-            None,  # live_media_locals - 暂时设为None，稍后在路由中处理
-            0,     # live_media_count - 暂时设为0
-            fetch_time,
-        ),
+    core_row = (
+        str(host_mid),
+        str(id_str),
+        item.get("type"),
+        1 if visible else 0 if visible is not None else None,
+        publish_ts,
+        comment_id_str,
+        comment_type,
+        rid_str,
+        txt,
+        author_name,
+        archive_bvid,
+        archive_title,
+        archive_cover,
+        archive_desc if isinstance(archive_desc, str) else None,
+        article_title,
+        article_covers,
+        opus_title,
+        opus_summary_text,
+        media_locals_joined,
+        media_count,
+        None,  # live_media_locals - 暂时设为None，稍后在路由中处理
+        0,     # live_media_count - 暂时设为0
+        fetch_time,
     )
-    logger.info(f"normalize.core.saved host_mid={host_mid} id_str={id_str}")
 
     # 作者
     author_mid = module_author.get("mid") or module_author.get("id")
     author_name = module_author.get("name") or module_author.get("uname")
     face = module_author.get("face")
-    cursor.execute(
-        """
-        INSERT INTO dynamic_author (host_mid, id_str, author_mid, author_name, face)
-        VALUES (?, ?, ?, ?, ?)
-        ON CONFLICT(host_mid, id_str) DO UPDATE SET
-            author_mid = excluded.author_mid,
-            author_name = excluded.author_name,
-            face = excluded.face
-        """,
-        (
-            str(host_mid),
-            str(id_str),
-            str(author_mid) if author_mid is not None else None,
-            author_name,
-            face,
-        ),
+    author_row = (
+        str(host_mid),
+        str(id_str),
+        str(author_mid) if author_mid is not None else None,
+        author_name,
+        face,
     )
 
     # 统计
@@ -389,28 +431,94 @@ def save_normalized_dynamic_item(conn: sqlite3.Connection, host_mid: int, item:
     view_count = _to_int(
         module_stat.get("view") if isinstance(module_stat.get("view"), (int, str)) else (module_stat.get("view", {}).get("count") if isinstance(module_stat.get("view"), dict) else None)
     )
-    cursor.execute(
-        """
-        INSERT INTO dynamic_stat (host_mid, id_str, like_count, comment_count, repost_count, view_count)
-        VALUES (?, ?, ?, ?, ?, ?)
-        ON CONFLICT(host_mid, id_str) DO UPDATE SET
-            like_count = excluded.like_count,
-            comment_count = excluded.comment_count,
-            repost_count = excluded.repost_count,
-            view_count = excluded.view_count
-        """,
-        (
-            str(host_mid),
-            str(id_str),
-            like_count,
-            comment_count,
-            repost_count,
-            view_count,
-        ),
+    stat_row = (
+        str(host_mid),
+        str(id_str),
+        like_count,
+        comment_count,
+        repost_count,
+        view_count,
     )
 
+    return core_row, author_row, stat_row
 
-    conn.commit()
+
+def save_normalized_dynamic_items(
+    conn: sqlite3.Connection,
+    host_mid: int,
+    items: Iterable[Dict[str, Any]],
+    commit: bool = True,
+) -> int:
+    """将一批动态条目按多表结构保存/更新
+
+    - 核心信息 dynamic_core
+    - 作者 dynamic_author
+    - 统计 dynamic_stat
+
+    所有行先在内存中提取，再分别通过 executemany 批量写入，整批只提交一次事务。
+    单条提取失败只跳过该条；批量写入失败时回滚到保存点并逐条重试，
+    每条使用独立的 SAVEPOINT，坏条目单独回滚，其余条目照常保存。
+    commit 为 False 时由调用方负责提交（例如还需在同一事务中回写媒体路径）。
+
+    Returns:
+        实际写入的条目数
+    """
+    fetch_time = int(datetime.now().timestamp())
+    core_rows = []
+    author_rows = []
+    stat_rows = []
+    for item in items:
+        try:
+            rows = _build_dynamic_rows(host_mid, item, fetch_time)
+        except Exception as e:
+            logger.warning(f"normalize.skip: 提取动态条目失败 id_str={item.get('id_str') if isinstance(item, dict) else None}: {e}")
+            continue
+        if rows is None:
+            continue
+        core_row, author_row, stat_row = rows
+        core_rows.append(core_row)
+        author_rows.append(author_row)
+        stat_rows.append(stat_row)
+
+    if not core_rows:
+        return 0
+
+    logger.info(f"normalize.core.upsert begin host_mid={host_mid} count={len(core_rows)}")
+    cursor = conn.cursor()
+    if not conn.in_transaction:
+        cursor.execute("BEGIN")
+    cursor.execute("SAVEPOINT dynamic_batch")
+    saved = len(core_rows)
+    try:
+        cursor.executemany(_UPSERT_CORE_SQL, core_rows)
+        cursor.executemany(_UPSERT_AUTHOR_SQL, author_rows)
+        cursor.executemany(_UPSERT_STAT_SQL, stat_rows)
+    except sqlite3.Error as e:
+        logger.warning(f"normalize.core.upsert 批量写入失败，改为逐条写入 host_mid={host_mid}: {e}")
+        cursor.execute("ROLLBACK TO dynamic_batch")
+        saved = 0
+        for core_row, author_row, stat_row in zip(core_rows, author_rows, stat_rows):
+            cursor.execute("SAVEPOINT dynamic_item")
+            try:
+                cursor.execute(_UPSERT_CORE_SQL, core_row)
+                cursor.execute(_UPSERT_AUTHOR_SQL, author_row)
+                cursor.execute(_UPSERT_STAT_SQL, stat_row)
+                saved += 1
+            except sqlite3.Error as item_err:
+                cursor.execute("ROLLBACK TO dynamic_item")
+                logger.warning(f"normalize.skip: 保存动态条目失败 id_str={core_row[1]}: {item_err}")
+            cursor.execute("RELEASE dynamic_item")
+    cursor.execute("RELEASE dynamic_batch")
+    _refresh_host_stats(cursor, host_mid)
+    if commit:
+        conn.commit()
+    logger.info(f"normalize.core.saved host_mid={host_mid} count={saved}")
+    return saved
+
+
+def save_normalized_dynamic_item(conn: sqlite3.Connection, host_mid: int, item: Dict[str, Any]) -> None:
+    """将单条动态条目按多表结构保存/更新，见 save_normalized_dynamic_items"""
+    save_normalized_dynamic_items(conn, host_mid, [item])
 
 
 def list_hosts_with_stats(
@@ -427,14 +535,9 @@ def list_hosts_with_stats(
     rows = cursor.execute(
         (
             """
-            SELECT dc.host_mid AS host_mid,
-                   COUNT(*) AS item_count,
-                   COUNT(*) AS core_count,
-                   MAX(dc.publish_ts) AS last_publish_ts,
-                   MAX(dc.fetch_time) AS last_fetch_time
-            FROM dynamic_core AS dc
-            GROUP BY dc.host_mid
-            ORDER BY (MAX(dc.publish_ts) IS NULL) ASC, MAX(dc.publish_ts) DESC, COUNT(*) DESC
+            SELECT host_mid, item_count, item_count AS core_count, last_publish_ts, last_fetch_time
+            FROM dynamic_host_stats
+            ORDER BY last_publish_ts DESC, item_count DESC
             LIMIT ? OFFSET ?
             """
         ),
@@ -475,28 +578,36 @@ def list_dynamics_for_host(
     cursor = conn.cursor()
     host_mid_str = str(host_mid)
 
-    # 统计 core 数量
-    core_total_row = cursor.execute(
-        "SELECT COUNT(*) FROM dynamic_core WHERE host_mid = ?",
-        (host_mid_str,),
-    ).fetchone()
-    core_total = int(core_total_row[0]) if core_total_row and core_total_row[0] is not None else 0
+    # 分页数据与总数在同一次查询中取得。总数用只执行一次的标量子查询统计，
+    # 而非窗口函数，这样分页部分可以直接沿 idx_dynamic_core_host_pub 索引顺序读取，无需排序。
+    # SQLite 中 NULL 在 DESC 排序时位于最后，publish_ts 为空的动态自然排在末尾。
+    rows = cursor.execute(
+        (
+            """
+            SELECT host_mid, id_str, type, visible, publish_ts, comment_id_str, comment_type, rid_str,
+                   txt, author_name, bvid, title, cover, desc, article_title, article_covers, 
+                   opus_title, opus_summary_text, media_locals, media_count, live_media_locals, live_media_count, fetch_time,
+                   (SELECT COUNT(*) FROM dynamic_core WHERE host_mid = ?) AS total
+            FROM dynamic_core
+            WHERE host_mid = ?
+            ORDER BY publish_ts DESC, fetch_time DESC
+            LIMIT ? OFFSET ?
+            """
+        ),
+        (host_mid_str, host_mid_str, limit, offset),
+    ).fetchall()
+
+    if rows:
+        core_total = int(rows[0][-1])
+    else:
+        # 当前页没有行可携带总数（无数据或偏移量超出范围），单独统计
+        core_total_row = cursor.execute(
+            "SELECT COUNT(*) FROM dynamic_core WHERE host_mid = ?",
+            (host_mid_str,),
+        ).fetchone()
+        core_total = int(core_total_row[0]) if core_total_row and core_total_row[0] is not None else 0
 
     if core_total > 0:
-        rows = cursor.execute(
-            (
-                """
-                SELECT host_mid, id_str, type, visible, publish_ts, comment_id_str, comment_type, rid_str,
-                       txt, author_name, bvid, title, cover, desc, article_title, article_covers, 
-                       opus_title, opus_summary_text, media_locals, media_count, live_media_locals, live_media_count, fetch_time
-                FROM dynamic_core
-                WHERE host_mid = ?
-                ORDER BY (publish_ts IS NULL) ASC, publish_ts DESC, fetch_time DESC
-                LIMIT ? OFFSET ?
-                """
-            ),
-            (host_mid_str, limit, offset),
-        ).fetchall()
         items: List[Dict[str, Any]] = []
         for r in rows:
             (
@@ -523,6 +634,7 @@ def list_dynamics_for_host(
                 live_media_locals,
                 live_media_count,
                 fetch_time,
+                _total,
             ) = r
             items.append(
                 {
@@ -1,93 +1,113 @@
 import asyncio
 import hashlib
 import os
-from typing import Dict, Iterable, List, Set, Tuple, Any
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Set, Tuple, Any
 from urllib.parse import urlparse
 
 import aiohttp
-import aiofiles
+
+# 媒体下载共享的请求头
+MEDIA_REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/130.0.0.0 Safari/537.36',
+    'Referer': 'https://www.bilibili.com/'
+}
+
+class MediaDownloadResult(NamedTuple):
+    """单个图片或表情的下载结果"""
+    url: str
+    path: str
+    ok: bool
+
+
+class LiveMediaDownloadResult(NamedTuple):
+    """实况媒体(图片+视频)的下载结果"""
+    image_url: str
+    video_url: str
+    image_path: str
+    video_path: str
+    ok: bool
+
+
+# 启动时预热连接的B站图片CDN域名
+MEDIA_CDN_HOSTS = ("i0.hdslb.com", "i1.hdslb.com", "i2.hdslb.com")
+
+# 流式下载时每次读取的块大小
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# 识别为图片的扩展名
+_IMG_EXTS = (".jpg", ".jpeg", ".png", ".gif", ".webp")
+
+# 表情文件名中需要替换的非法字符
+_EMOJI_SANITIZE = str.maketrans({c: '_' for c in '<>:"/\\|?*'})
 
 
 def _looks_like_image_url(url: str) -> bool:
     if not isinstance(url, str):
         return False
-    if not url.startswith("http://") and not url.startswith("https://"):
+    if not url.startswith(("http://", "https://")):
         return False
     lower = url.lower()
-    if any(ext in lower for ext in [".jpg", ".jpeg", ".png", ".gif", ".webp"]):
-        return True
-    # 常见B站图片CDN路径包含 /bfs/，即便未带扩展名
+    # 常见B站图片CDN路径包含 /bfs/，即便未带扩展名；先做这一次扫描，命中时省去逐个扩展名的查找
     if "/bfs/" in lower:
         return True
-    return False
-
-
-def _walk_collect_urls(obj: Any, path: List[str], collector: Set[str]) -> None:
-    """递归遍历对象并按上下文收集图片URL，排除标签、头像和表情相关图片"""
-    # 路径关键字，用于排除
-    path_lower = [p.lower() for p in path]
-
-    def is_label_context() -> bool:
-        return any(p == "label" for p in path_lower)
-
-    def is_avatar_context() -> bool:
-        return any(p in ("avatar", "face", "avatar_subscript_url") for p in path_lower)
+    # 扩展名后常带有 @裁剪参数 或查询串，因此按子串而不是 endswith 判断
+    return any(ext in lower for ext in _IMG_EXTS)
+
+
+# 落在这些键下的子树属于标签、头像、装扮卡片或互动区域，不收集其中任何URL
+_EXCLUDED_CONTEXT_KEYS = frozenset((
+    "label",
+    "avatar", "face", "avatar_subscript_url",
+    "decorate", "decorate_card", "decoration_card",
+    "module_interaction",
+    # 已知的标签图片字段
+    "img_label_uri_hans",
+    "img_label_uri_hans_static",
+    "img_label_uri_hant",
+    "img_label_uri_hant_static",
+    "label_theme",
+))
+
+
+def _is_emoji_node(obj: Dict) -> bool:
+    """检查字典是否是表情节点或表情数据结构"""
+    if obj.get("type") == "RICH_TEXT_NODE_TYPE_EMOJI":
+        return True
+    emoji_data = obj.get("emoji")
+    return isinstance(emoji_data, dict) and "icon_url" in emoji_data and "text" in emoji_data
 
-    def is_decorate_card_context() -> bool:
-        return any(p in ("decorate", "decorate_card", "decoration_card") for p in path_lower)
 
-    def is_interaction_context() -> bool:
-        return any(p == "module_interaction" for p in path_lower)
+def _walk_collect_urls(root: Any, collector: Set[str]) -> None:
+    """迭代遍历对象并按上下文收集图片URL，排除标签、头像和表情相关图片
 
-    def is_emoji_context() -> bool:
-        """检查是否是表情上下文"""
+    排除区域在入栈时按键名直接剪枝，因此无需为每个节点维护和检查完整路径。
+    """
+    stack = [root]
+    while stack:
+        obj = stack.pop()
         if isinstance(obj, dict):
-            # 检查是否是表情节点
-            if obj.get("type") == "RICH_TEXT_NODE_TYPE_EMOJI":
-                return True
-            # 检查是否在表情数据结构中
-            if "emoji" in obj and isinstance(obj["emoji"], dict):
-                emoji_data = obj["emoji"]
-                if "icon_url" in emoji_data and "text" in emoji_data:
-                    return True
-        return False
-
-    # 如果当前路径已经落在 label、avatar、表情相关区域，直接不收集其下任何URL
-    if is_label_context() or is_avatar_context() or is_decorate_card_context() or is_interaction_context() or is_emoji_context():
-        return
-
-    if isinstance(obj, dict):
-        for k, v in obj.items():
-            # 对于已知的标签字段，跳过
-            k_lower = str(k).lower()
-            if k_lower in (
-                "img_label_uri_hans",
-                "img_label_uri_hans_static",
-                "img_label_uri_hant",
-                "img_label_uri_hant_static",
-                "label_theme",
-            ):
+            # 表情相关节点下的任何URL都不收集
+            if _is_emoji_node(obj):
                 continue
-
-            _walk_collect_urls(v, path + [str(k)], collector)
-    elif isinstance(obj, list):
-        for idx, v in enumerate(obj):
-            _walk_collect_urls(v, path + [str(idx)], collector)
-    elif isinstance(obj, str):
-        s = obj
-        if _looks_like_image_url(s):
-            # 额外基于URL路径排除头像类
-            low = s.lower()
-            if "/bfs/face/" in low or "/face/" in low:
-                return
-            # 其它图片加入集合
-            collector.add(s)
+            for k, v in obj.items():
+                if str(k).lower() not in _EXCLUDED_CONTEXT_KEYS:
+                    stack.append(v)
+        elif isinstance(obj, list):
+            stack.extend(obj)
+        elif isinstance(obj, str):
+            if _looks_like_image_url(obj):
+                # 额外基于URL路径排除头像类
+                low = obj.lower()
+                if "/bfs/face/" in low or "/face/" in low:
+                    continue
+                collector.add(obj)
 
 
 def collect_image_urls(dynamic_item: Dict) -> List[str]:
     """从动态条目中抽取图片类URL（包含视频封面），排除标签图片与头像图片"""
     urls: Set[str] = set()
-    _walk_collect_urls(dynamic_item, [], urls)
+    _walk_collect_urls(dynamic_item, urls)
     return list(urls)
 
 
@@ -95,7 +115,10 @@ def collect_live_media_urls(dynamic_item: Dict) -> List[Tuple[str, str]]:
     """从动态条目中抽取实况媒体URL，返回(image_url, video_url)的元组列表"""
     live_media: List[Tuple[str, str]] = []
     
-    def _extract_live_media(obj: Any, path: List[str]) -> None:
+    # 显式栈模拟先序遍历，子节点逆序入栈以保持原有的结果顺序
+    stack = [dynamic_item]
+    while stack:
+        obj = stack.pop()
         if isinstance(obj, dict):
             # 检查是否包含live_url字段
             if "live_url" in obj and "url" in obj:
@@ -103,14 +126,10 @@ def collect_live_media_urls(dynamic_item: Dict) -> List[Tuple[str, str]]:
                 live_url = obj.get("live_url")
                 if image_url and live_url and live_url != "null":
                     live_media.append((image_url, live_url))
-            
-            for k, v in obj.items():
-                _extract_live_media(v, path + [str(k)])
+            stack.extend(reversed(obj.values()))
         elif isinstance(obj, list):
-            for i, item in enumerate(obj):
-                _extract_live_media(item, path + [str(i)])
-    
-    _extract_live_media(dynamic_item, [])
+            stack.extend(reversed(obj))
+
     return live_media
 
 
@@ -118,10 +137,13 @@ def collect_emoji_urls(dynamic_item: Dict) -> List[Tuple[str, str]]:
     """从动态条目中抽取表情URL，返回(emoji_url, emoji_text)的元组列表"""
     emoji_list: List[Tuple[str, str]] = []
     
-    def _extract_emojis(obj: Any, path: List[str]) -> None:
+    # 显式栈模拟先序遍历，子节点逆序入栈以保持原有的结果顺序
+    stack = [dynamic_item]
+    while stack:
+        obj = stack.pop()
         if isinstance(obj, dict):
             # 检查是否是表情节点
-            if (obj.get("type") == "RICH_TEXT_NODE_TYPE_EMOJI" and 
+            if (obj.get("type") == "RICH_TEXT_NODE_TYPE_EMOJI" and
                 "emoji" in obj and isinstance(obj["emoji"], dict)):
                 emoji_data = obj["emoji"]
                 icon_url = emoji_data.get("icon_url")
@@ -131,33 +153,113 @@ def collect_emoji_urls(dynamic_item: Dict) -> List[Tuple[str, str]]:
                     clean_text = text.strip("[]")
                     if clean_text:
                         emoji_list.append((icon_url, clean_text))
-            
-            for k, v in obj.items():
-                _extract_emojis(v, path + [str(k)])
+            stack.extend(reversed(obj.values()))
         elif isinstance(obj, list):
-            for i, item in enumerate(obj):
-                _extract_emojis(item, path + [str(i)])
-    
-    _extract_emojis(dynamic_item, [])
+            stack.extend(reversed(obj))
+
     return emoji_list
 
 
+def collect_all_media(dynamic_item: Dict) -> Tuple[List[str], List[Tuple[str, str]], List[Tuple[str, str]]]:
+    """一次遍历同时抽取图片URL、实况媒体和表情，返回(image_urls, live_media_pairs, emoji_pairs)
+
+    结果分别与 collect_image_urls、collect_live_media_urls、collect_emoji_urls 一致。
+    每个栈元素携带“是否处于排除区域”的标记，只用于控制图片收集，实况媒体和表情始终抽取。
+    """
+    image_urls: Set[str] = set()
+    live_media: List[Tuple[str, str]] = []
+    emoji_list: List[Tuple[str, str]] = []
+
+    stack: List[Tuple[Any, bool]] = [(dynamic_item, False)]
+    # 热点循环中频繁调用的方法绑定为局部变量
+    pop = stack.pop
+    push = stack.append
+    add_image = image_urls.add
+    while stack:
+        obj, excluded = pop()
+        if isinstance(obj, dict):
+            if "live_url" in obj and "url" in obj:
+                image_url = obj.get("url")
+                live_url = obj.get("live_url")
+                if image_url and live_url and live_url != "null":
+                    live_media.append((image_url, live_url))
+
+            if (obj.get("type") == "RICH_TEXT_NODE_TYPE_EMOJI" and
+                "emoji" in obj and isinstance(obj["emoji"], dict)):
+                emoji_data = obj["emoji"]
+                icon_url = emoji_data.get("icon_url")
+                text = emoji_data.get("text", "")
+                if icon_url and text:
+                    clean_text = text.strip("[]")
+                    if clean_text:
+                        emoji_list.append((icon_url, clean_text))
+
+            if not excluded and _is_emoji_node(obj):
+                excluded = True
+            for k, v in reversed(obj.items()):
+                push((v, excluded or str(k).lower() in _EXCLUDED_CONTEXT_KEYS))
+        elif isinstance(obj, list):
+            stack.extend((v, excluded) for v in reversed(obj))
+        elif not excluded and isinstance(obj, str) and _looks_like_image_url(obj):
+            low = obj.lower()
+            if "/bfs/face/" not in low and "/face/" not in low:
+                add_image(obj)
+
+    return list(image_urls), live_media, emoji_list
+
+
+@lru_cache(maxsize=4096)
 def _guess_extension(url: str) -> str:
     path = urlparse(url).path
     _, ext = os.path.splitext(path)
     ext = (ext or "").lower()
-    if ext in [".jpg", ".jpeg", ".png", ".gif", ".webp"]:
+    if ext in _IMG_EXTS:
         return ext
     return ".jpg"
 
 
+@lru_cache(maxsize=4096)
 def _hash_name(url: str) -> str:
+    # 仅用于生成文件名，无安全要求；BLAKE2b-128 比 MD5 更快且同为32位十六进制
+    return hashlib.blake2b(url.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _legacy_hash_name(url: str) -> str:
+    """旧版本使用的MD5文件名，用于复用已下载的文件"""
     return hashlib.md5(url.encode("utf-8")).hexdigest()
 
 
-def predict_image_path(url: str, save_dir: str) -> str:
-    """基于链接原始文件名预测保存路径（不依赖下载结果）"""
-    os.makedirs(save_dir, exist_ok=True)
+def _hashed_media_name(url: str, ext: str, existing_names: Set[str]) -> str:
+    """按URL哈希生成文件名；若目录中只存在旧版MD5命名的文件则沿用旧文件名，避免重复下载"""
+    name = _hash_name(url) + ext
+    if name not in existing_names:
+        legacy_name = _legacy_hash_name(url) + ext
+        if legacy_name in existing_names:
+            return legacy_name
+    return name
+
+
+async def _stream_to_file(resp: aiohttp.ClientResponse, path: str) -> None:
+    """按块将响应体写入磁盘，先写临时文件，完整下载后再替换为目标文件"""
+    tmp_path = path + ".part"
+    f = await asyncio.to_thread(open, tmp_path, "wb")
+    try:
+        async for chunk in resp.content.iter_chunked(STREAM_CHUNK_SIZE):
+            await asyncio.to_thread(f.write, chunk)
+    except BaseException:
+        f.close()
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    await asyncio.to_thread(f.close)
+    os.replace(tmp_path, path)
+
+
+@lru_cache(maxsize=4096)
+def _predict_image_name(url: str) -> str:
+    """基于链接原始文件名推导保存文件名（纯计算，结果可缓存）"""
     path = urlparse(url).path
     base = os.path.basename(path)
     if not base:
@@ -166,155 +268,252 @@ def predict_image_path(url: str, save_dir: str) -> str:
     root, ext = os.path.splitext(base)
     if not ext:
         base = f"{base}{_guess_extension(url)}"
-    return os.path.join(save_dir, base)
+    return base
 
 
-async def _download_one(session: aiohttp.ClientSession, url: str, save_dir: str) -> Tuple[str, str, bool]:
+def _list_file_names(directory: str) -> Set[str]:
+    """返回目录下已存在的文件名集合"""
+    with os.scandir(directory) as entries:
+        return {entry.name for entry in entries if entry.is_file()}
+
+
+def predict_image_path(url: str, save_dir: str) -> str:
+    """基于链接原始文件名预测保存路径（不依赖下载结果）"""
     os.makedirs(save_dir, exist_ok=True)
-    save_path = predict_image_path(url, save_dir)
+    return os.path.join(save_dir, _predict_image_name(url))
+
+
+_session: aiohttp.ClientSession | None = None
+_session_loop: asyncio.AbstractEventLoop | None = None
+
+
+# 正在关闭的旧会话任务，保留引用避免任务在完成前被回收
+_closing_tasks: set = set()
+
+
+def _discard_session(session: aiohttp.ClientSession, session_loop: asyncio.AbstractEventLoop | None,
+                     loop: asyncio.AbstractEventLoop) -> None:
+    """关闭因事件循环变化而被替换的旧会话，避免泄漏连接器"""
+    if session.closed:
+        return
+    if session_loop is not None and session_loop.is_running():
+        # 旧事件循环仍在其他线程中运行：连接只能在它自己的循环中关闭
+        asyncio.run_coroutine_threadsafe(session.close(), session_loop)
+    else:
+        # 旧事件循环已停止：连接器会同步关闭，剩余的等待在当前循环中完成即可
+        task = loop.create_task(session.close())
+        _closing_tasks.add(task)
+        task.add_done_callback(_closing_tasks.discard)
+
+
+def _get_session() -> aiohttp.ClientSession:
+    """获取共享的下载会话，复用连接和DNS缓存；会话已关闭或事件循环变化时重新创建"""
+    global _session, _session_loop
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _session_loop is not loop:
+        if _session is not None:
+            _discard_session(_session, _session_loop, loop)
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=32, limit_per_host=16, ttl_dns_cache=300, keepalive_timeout=60),
+            headers=MEDIA_REQUEST_HEADERS,
+        )
+        _session_loop = loop
+    return _session
+
+
+async def warm_up_media_session() -> None:
+    """预先解析CDN域名并建立TLS连接，使首批媒体下载可以直接复用连接池中的连接"""
+    session = _get_session()
+
+    async def warm(host: str) -> None:
+        try:
+            async with session.head(f"https://{host}/", timeout=aiohttp.ClientTimeout(total=5)):
+                pass
+        except Exception:
+            # 预热失败不影响后续正常下载
+            pass
+
+    await asyncio.gather(*(warm(host) for host in MEDIA_CDN_HOSTS))
+
+
+async def close_media_session() -> None:
+    """关闭共享的下载会话，应在应用关闭时调用"""
+    global _session, _session_loop
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+    _session_loop = None
+
+
+async def _download_one(session: aiohttp.ClientSession, url: str, save_dir: str) -> MediaDownloadResult:
+    save_path = os.path.join(save_dir, _predict_image_name(url))
 
     try:
         async with session.get(url, timeout=aiohttp.ClientTimeout(total=20)) as resp:
-            if resp.status != 200:
-                return url, save_path, False
             content_type = resp.headers.get("content-type", "").lower()
-            if "image" not in content_type:
-                return url, save_path, False
-            data = await resp.read()
-            async with aiofiles.open(save_path, "wb") as f:
-                await f.write(data)
-            return url, save_path, True
+            if resp.status != 200 or "image" not in content_type:
+                # 只凭响应头判断，直接断开连接而不读取响应体，避免为非图片链接传输数据
+                resp.close()
+                return MediaDownloadResult(url, save_path, False)
+            await _stream_to_file(resp, save_path)
+            return MediaDownloadResult(url, save_path, True)
     except Exception:
-        return url, save_path, False
+        return MediaDownloadResult(url, save_path, False)
 
 
-async def download_images(urls: Iterable[str], save_dir: str, concurrency: int = 6) -> List[Tuple[str, str, bool]]:
+async def download_images(urls: Iterable[str], save_dir: str, concurrency: int = 6) -> List[MediaDownloadResult]:
     unique_urls = list(dict.fromkeys(urls))
     if not unique_urls:
         return []
 
+    os.makedirs(save_dir, exist_ok=True)
+    # 一次性列出目录中已有的文件，已下载过的图片直接返回成功，不再发起请求
+    existing_names = await asyncio.to_thread(_list_file_names, save_dir)
+    results_by_url: Dict[str, MediaDownloadResult] = {}
+    missing_urls = []
+    for u in unique_urls:
+        name = _predict_image_name(u)
+        if name in existing_names:
+            results_by_url[u] = MediaDownloadResult(u, os.path.join(save_dir, name), True)
+        else:
+            missing_urls.append(u)
+    if not missing_urls:
+        return [results_by_url[u] for u in unique_urls]
+
     sem = asyncio.Semaphore(concurrency)
 
-    async with aiohttp.ClientSession(headers={
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/130.0.0.0 Safari/537.36',
-        'Referer': 'https://www.bilibili.com/'
-    }) as session:
-        async def bound(u: str):
-            async with sem:
-                return await _download_one(session, u, save_dir)
+    session = _get_session()
+
+    async def bound(u: str):
+        async with sem:
+            return await _download_one(session, u, save_dir)
 
-        tasks = [bound(u) for u in unique_urls]
-        results = await asyncio.gather(*tasks, return_exceptions=False)
-        return results
+    tasks = [bound(u) for u in missing_urls]
+    for result in await asyncio.gather(*tasks, return_exceptions=False):
+        results_by_url[result.url] = result
+    return [results_by_url[u] for u in unique_urls]
 
 
-async def _download_live_media(session: aiohttp.ClientSession, image_url: str, video_url: str, save_dir: str) -> Tuple[str, str, str, str, bool]:
+async def _download_live_media(session: aiohttp.ClientSession, image_url: str, video_url: str, save_dir: str, existing_names: Set[str]) -> LiveMediaDownloadResult:
     """下载实况媒体(图片和视频)，返回(image_url, video_url, image_path, video_path, success)"""
-    os.makedirs(save_dir, exist_ok=True)
-    
     # 生成文件名
-    image_name = _hash_name(image_url) + _guess_extension(image_url)
-    video_name = _hash_name(video_url) + ".mp4"  # live视频通常是mp4格式
-    
+    image_name = _hashed_media_name(image_url, _guess_extension(image_url), existing_names)
+    video_name = _hashed_media_name(video_url, ".mp4", existing_names)  # live视频通常是mp4格式
+
     image_path = os.path.join(save_dir, image_name)
     video_path = os.path.join(save_dir, video_name)
     
     try:
         # 下载图片
         image_success = False
-        if not os.path.exists(image_path):
+        if image_name not in existing_names:
             async with session.get(image_url) as resp:
                 if resp.status == 200:
-                    data = await resp.read()
-                    async with aiofiles.open(image_path, "wb") as f:
-                        await f.write(data)
+                    await _stream_to_file(resp, image_path)
                     image_success = True
         else:
             image_success = True
             
         # 下载视频
         video_success = False
-        if not os.path.exists(video_path):
+        if video_name not in existing_names:
             async with session.get(video_url) as resp:
                 if resp.status == 200:
-                    data = await resp.read()
-                    async with aiofiles.open(video_path, "wb") as f:
-                        await f.write(data)
+                    await _stream_to_file(resp, video_path)
                     video_success = True
         else:
             video_success = True
             
-        return image_url, video_url, image_path, video_path, (image_success and video_success)
+        return LiveMediaDownloadResult(image_url, video_url, image_path, video_path, image_success and video_success)
     except Exception:
-        return image_url, video_url, image_path, video_path, False
+        return LiveMediaDownloadResult(image_url, video_url, image_path, video_path, False)
 
 
-async def download_live_media(live_media_pairs: List[Tuple[str, str]], save_dir: str, concurrency: int = 3) -> List[Tuple[str, str, str, str, bool]]:
+async def download_live_media(live_media_pairs: List[Tuple[str, str]], save_dir: str, concurrency: int = 3) -> List[LiveMediaDownloadResult]:
     """下载实况媒体列表，返回下载结果"""
     if not live_media_pairs:
         return []
-        
+
+    os.makedirs(save_dir, exist_ok=True)
+    # 一次性列出目录中已有的文件，代替逐个文件的存在性检查
+    existing_names = await asyncio.to_thread(_list_file_names, save_dir)
+
     sem = asyncio.Semaphore(concurrency)
     
-    async with aiohttp.ClientSession(headers={
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/130.0.0.0 Safari/537.36',
-        'Referer': 'https://www.bilibili.com/'
-    }) as session:
-        async def bound(pair: Tuple[str, str]):
-            async with sem:
-                image_url, video_url = pair
-                return await _download_live_media(session, image_url, video_url, save_dir)
-                
-        tasks = [bound(pair) for pair in live_media_pairs]
-        results = await asyncio.gather(*tasks, return_exceptions=False)
-        return results
-
-
-async def _download_emoji(session: aiohttp.ClientSession, emoji_url: str, emoji_text: str, save_dir: str) -> Tuple[str, str, bool]:
+    session = _get_session()
+
+    async def bound(pair: Tuple[str, str]):
+        async with sem:
+            image_url, video_url = pair
+            return await _download_live_media(session, image_url, video_url, save_dir, existing_names)
+
+    # 相同的实况媒体只下载一次，避免并发写同一个文件
+    unique_pairs = list(dict.fromkeys(live_media_pairs))
+    tasks = [bound(pair) for pair in unique_pairs]
+    results_by_pair = dict(zip(unique_pairs, await asyncio.gather(*tasks, return_exceptions=False)))
+    return [results_by_pair[pair] for pair in live_media_pairs]
+
+
+async def _download_emoji(session: aiohttp.ClientSession, emoji_url: str, emoji_text: str, save_dir: str, existing_names: Set[str]) -> MediaDownloadResult:
     """下载单个表情，返回(emoji_url, emoji_path, success)"""
-    os.makedirs(save_dir, exist_ok=True)
-    
     # 使用表情文本作为文件名，并添加.png扩展名
     # 清理文件名中的非法字符
-    import re
-    safe_name = re.sub(r'[<>:"/\\|?*]', '_', emoji_text)
+    safe_name = emoji_text.translate(_EMOJI_SANITIZE)
     emoji_name = f"{safe_name}.png"
     emoji_path = os.path.join(save_dir, emoji_name)
     
     try:
-        if not os.path.exists(emoji_path):
+        if emoji_name not in existing_names:
             async with session.get(emoji_url) as resp:
                 if resp.status == 200:
-                    data = await resp.read()
-                    async with aiofiles.open(emoji_path, "wb") as f:
-                        await f.write(data)
-                    return emoji_url, emoji_path, True
+                    await _stream_to_file(resp, emoji_path)
+                    return MediaDownloadResult(emoji_url, emoji_path, True)
         else:
-            return emoji_url, emoji_path, True
+            return MediaDownloadResult(emoji_url, emoji_path, True)
     except Exception:
         pass
     
-    return emoji_url, emoji_path, False
+    return MediaDownloadResult(emoji_url, emoji_path, False)
 
 
-async def download_emojis(emoji_pairs: List[Tuple[str, str]], save_dir: str, concurrency: int = 6) -> List[Tuple[str, str, bool]]:
+async def download_emojis(emoji_pairs: List[Tuple[str, str]], save_dir: str, concurrency: int = 6) -> List[MediaDownloadResult]:
     """下载表情列表，返回下载结果"""
     if not emoji_pairs:
         return []
-        
-    sem = asyncio.Semaphore(concurrency)
-    
-    async with aiohttp.ClientSession(headers={
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/130.0.0.0 Safari/537.36',
-        'Referer': 'https://www.bilibili.com/'
-    }) as session:
-        async def bound(pair: Tuple[str, str]):
-            async with sem:
-                emoji_url, emoji_text = pair
-                return await _download_emoji(session, emoji_url, emoji_text, save_dir)
-                
-        tasks = [bound(pair) for pair in emoji_pairs]
-        results = await asyncio.gather(*tasks, return_exceptions=False)
-        return results
 
+    os.makedirs(save_dir, exist_ok=True)
+    # 一次性列出目录中已有的文件，代替逐个文件的存在性检查
+    existing_names = await asyncio.to_thread(_list_file_names, save_dir)
 
+    sem = asyncio.Semaphore(concurrency)
+    
+    session = _get_session()
+
+    async def bound(pair: Tuple[str, str]):
+        async with sem:
+            emoji_url, emoji_text = pair
+            return await _download_emoji(session, emoji_url, emoji_text, save_dir, existing_names)
+
+    # 同一条动态中重复出现的表情只下载一次，避免并发写同一个文件
+    unique_pairs = list(dict.fromkeys(emoji_pairs))
+    tasks = [bound(pair) for pair in unique_pairs]
+    results_by_pair = dict(zip(unique_pairs, await asyncio.gather(*tasks, return_exceptions=False)))
+    return [results_by_pair[pair] for pair in emoji_pairs]
+
+
+async def download_dynamic_media(
+    image_urls: List[str],
+    live_media_pairs: List[Tuple[str, str]],
+    emoji_pairs: List[Tuple[str, str]],
+    save_dir: str,
+) -> Tuple[List[MediaDownloadResult], List[LiveMediaDownloadResult], List[MediaDownloadResult]]:
+    """并发下载一条动态的图片、实况媒体和表情，返回(image_results, live_results, emoji_results)
+
+    三类媒体共用同一个连接池，整体耗时取决于最慢的一类而不是三者之和。
+    """
+    image_results, live_results, emoji_results = await asyncio.gather(
+        download_images(image_urls, save_dir),
+        download_live_media(live_media_pairs, save_dir),
+        download_emojis(emoji_pairs, save_dir),
+    )
+    return image_results, live_results, emoji_results
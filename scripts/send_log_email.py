@@ -1,5 +1,8 @@
+import asyncio
 import os
 import smtplib
+import threading
+import time
 from datetime import datetime
 from email.header import Header
 from email.mime.multipart import MIMEMultipart
@@ -14,12 +17,67 @@ from scripts.utils import load_config, setup_logger, get_logs_path
 setup_logger()
 
 
+# 计划任务开始的标记
+TASK_START_MARKERS = tuple(marker.encode('utf-8') for marker in (
+    "=== 执行任务链:",         # 主任务链开始
+    "=== 执行任务:",          # 单个任务开始
+    "=== 调度器触发任务执行"    # 调度器触发的任务
+))
+
+# 复用SMTP连接的最长空闲时间（秒），超过后重新建立连接
+SMTP_IDLE_TIMEOUT = 60
+
+# 从日志末尾向前扫描时每次读取的字节数
+LOG_SCAN_CHUNK_SIZE = 64 * 1024
+
+
+def _find_last_marker_line_offset(f, markers, chunk_size: int = LOG_SCAN_CHUNK_SIZE) -> int:
+    """
+    从文件末尾按块向前扫描，返回最后一个包含任一标记的行的起始字节偏移
+
+    Args:
+        f: 以二进制模式打开的文件对象
+        markers: 需要查找的字节串标记
+        chunk_size: 每次向前读取的字节数
+
+    Returns:
+        int: 行起始偏移，未找到时返回-1
+    """
+    f.seek(0, os.SEEK_END)
+    pos = f.tell()
+    carry = b""
+    while pos > 0:
+        read_size = min(chunk_size, pos)
+        pos -= read_size
+        f.seek(pos)
+        data = f.read(read_size) + carry
+
+        # 未读到文件开头时，块内第一行可能不完整，留到下一轮与前面的数据拼接后再检查
+        if pos > 0:
+            first_newline = data.find(b"\n")
+            if first_newline == -1:
+                carry = data
+                continue
+            scan_from = first_newline + 1
+        else:
+            scan_from = 0
+
+        region = data[scan_from:]
+        # 标记不跨行，位置最靠后的标记所在行就是最近一次任务的开始行
+        marker_pos = max(region.rfind(marker) for marker in markers)
+        if marker_pos != -1:
+            line_start = region.rfind(b"\n", 0, marker_pos) + 1
+            return pos + scan_from + line_start
+        carry = data[:scan_from]
+    return -1
+
+
 def get_task_execution_logs() -> str:
     """
     获取最近一次计划任务执行期间的完整日志内容
 
-    从当前日志文件中查找最近一次任务执行的日志，
-    包含从任务开始到文件结尾的所有日志内容。
+    从当前日志文件末尾向前查找最近一次任务执行的开始标记，
+    只读取从任务开始到文件结尾的日志内容。
 
     Returns:
         str: 最近一次计划任务执行的完整日志内容，如果没有找到则返回提示信息
@@ -31,43 +89,158 @@ def get_task_execution_logs() -> str:
     if not os.path.exists(log_file):
         return "今日暂无日志记录"
 
-    with open(log_file, 'r', encoding='utf-8') as f:
-        log_lines = f.readlines()
-    
-    # 如果日志为空
-    if not log_lines:
-        return "今日暂无日志记录"
+    with open(log_file, 'rb') as f:
+        # 如果日志为空
+        if f.seek(0, os.SEEK_END) == 0:
+            return "今日暂无日志记录"
 
-    # 查找最近一次计划任务执行的开始位置
-    start_index = -1
-    end_index = len(log_lines)  # 默认到文件末尾
-    
-    # 计划任务开始的标记
-    task_start_markers = [
-        "=== 执行任务链:",         # 主任务链开始
-        "=== 执行任务:",          # 单个任务开始
-        "=== 调度器触发任务执行"    # 调度器触发的任务
-    ]
-    
-    # 从后向前查找最近的任务执行开始标记
-    for i in range(len(log_lines) - 1, -1, -1):
-        line = log_lines[i]
-        if any(marker in line for marker in task_start_markers):
-            start_index = i
-            break
-    
-    # 如果找不到任务执行开始标记，则返回提示信息
-    if start_index == -1:
-        return "未找到任务执行记录"
-    
-    # 提取任务执行期间的日志 - 从开始标记一直到文件结束
-    task_logs = log_lines[start_index:end_index]
-    return "".join(task_logs)
+        # 从后向前查找最近的任务执行开始标记
+        start_offset = _find_last_marker_line_offset(f, TASK_START_MARKERS)
 
+        # 如果找不到任务执行开始标记，则返回提示信息
+        if start_offset == -1:
+            return "未找到任务执行记录"
 
-async def send_email(subject: str, content: Optional[str] = None, to_email: Optional[str] = None) -> Dict:
+        # 提取任务执行期间的日志 - 从开始标记一直到文件结束
+        f.seek(start_offset)
+        task_logs = f.read()
+
+    return task_logs.decode('utf-8', errors='replace').replace('\r\n', '\n')
+
+
+def _quit_quietly(server: smtplib.SMTP) -> None:
+    """安全关闭SMTP连接，忽略关闭过程中的任何异常"""
+    try:
+        server.quit()
+    except Exception:
+        try:
+            server.close()
+        except Exception:
+            pass
+
+
+def _open_smtp_connection(smtp_server: str, smtp_port: int, sender_email: str, sender_password: str) -> smtplib.SMTP:
+    """建立SMTP连接并完成STARTTLS与身份认证"""
+    # 支持本地邮件服务和mailrise转发，自动检测SSL支持
+    server = smtplib.SMTP(smtp_server, smtp_port, timeout=30)
+    try:
+        # 自动检测是否支持STARTTLS
+        try:
+            # 先尝试使用STARTTLS（适用于QQ邮箱等标准SMTP服务）
+            server.starttls()
+            logger.info("STARTTLS连接成功")
+        except smtplib.SMTPNotSupportedError:
+            # 如果服务器不支持STARTTLS（如本地mailrise），继续使用明文连接
+            logger.info("服务器不支持STARTTLS，使用明文连接")
+        except Exception as e:
+            # 如果STARTTLS失败，尝试明文连接
+            logger.warning(f"STARTTLS失败，尝试明文连接: {str(e)}")
+
+        # 智能认证：先尝试认证，失败则判断是否需要认证
+        try:
+            # 直接尝试登录认证（适用于大部分标准SMTP服务器）
+            server.login(sender_email, sender_password)
+            logger.info("身份认证成功")
+
+        except smtplib.SMTPNotSupportedError:
+            # 服务器明确不支持认证
+            logger.info("服务器不支持身份认证，跳过认证步骤")
+
+        except smtplib.SMTPAuthenticationError as e:
+            # 认证失败，可能是凭据错误或其他问题
+            logger.error(f"身份认证失败: {str(e)}")
+            raise Exception(f"身份认证失败: {str(e)}")
+
+        except Exception as e:
+            # 检查是否是"需要认证"的错误
+            error_str = str(e).lower()
+            if any(keyword in error_str for keyword in ['auth', 'authentication', 'login', 'need ehlo']):
+                # 明确要求认证的错误，不应该跳过
+                logger.error(f"服务器要求身份认证但认证失败: {str(e)}")
+                raise Exception(f"服务器要求身份认证: {str(e)}")
+            else:
+                # 其他类型错误，可能是不需要认证的服务器
+                logger.warning(f"认证过程出错，尝试无认证方式: {str(e)}")
+    except BaseException:
+        _quit_quietly(server)
+        raise
+    return server
+
+
+class _SmtpPool:
     """
-    发送邮件
+    复用已认证的SMTP连接
+
+    连续发送邮件时跳过TCP、STARTTLS和登录握手。空闲超过 SMTP_IDLE_TIMEOUT 的连接
+    直接关闭重建，复用前用 NOOP 确认连接仍然可用，发送时发现连接已断开则重连重试一次。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._server: Optional[smtplib.SMTP] = None
+        self._key = None
+        self._last_used = 0.0
+
+    def _take_idle_connection(self, key) -> Optional[smtplib.SMTP]:
+        """取出可复用的空闲连接，不可用时关闭并返回None"""
+        server, self._server = self._server, None
+        if server is None:
+            return None
+        if self._key != key or time.monotonic() - self._last_used > SMTP_IDLE_TIMEOUT:
+            _quit_quietly(server)
+            return None
+        try:
+            if server.noop()[0] == 250:
+                return server
+        except Exception:
+            pass
+        _quit_quietly(server)
+        return None
+
+    def send(self, smtp_server: str, smtp_port: int, sender_email: str, sender_password: str, message) -> None:
+        key = (smtp_server, smtp_port, sender_email, sender_password)
+        with self._lock:
+            server = self._take_idle_connection(key)
+            reused = server is not None
+            if server is None:
+                server = _open_smtp_connection(smtp_server, smtp_port, sender_email, sender_password)
+            try:
+                try:
+                    server.send_message(message)
+                except smtplib.SMTPServerDisconnected:
+                    if not reused:
+                        raise
+                    # 复用的连接可能已被服务器断开，重新建立连接后重试一次
+                    logger.info("SMTP连接已断开，重新连接后重试")
+                    _quit_quietly(server)
+                    server = _open_smtp_connection(smtp_server, smtp_port, sender_email, sender_password)
+                    server.send_message(message)
+            except BaseException:
+                _quit_quietly(server)
+                raise
+            self._server = server
+            self._key = key
+            self._last_used = time.monotonic()
+
+    def close(self) -> None:
+        with self._lock:
+            server, self._server = self._server, None
+            self._key = None
+        if server is not None:
+            _quit_quietly(server)
+
+
+_smtp_pool = _SmtpPool()
+
+
+def close_smtp_connection() -> None:
+    """关闭复用的SMTP连接，应在应用关闭时调用"""
+    _smtp_pool.close()
+
+
+def _send_email_sync(subject: str, content: Optional[str] = None, to_email: Optional[str] = None) -> Dict:
+    """
+    同步发送邮件，包含读取配置、日志和SMTP通信等全部阻塞操作
 
     Args:
         subject: 邮件主题
@@ -108,75 +281,14 @@ async def send_email(subject: str, content: Optional[str] = None, to_email: Opti
         message.attach(MIMEText(content, 'plain', 'utf-8'))
 
         # 连接SMTP服务器并发送
-        server = None
-        email_sent = False
-
         try:
-            # 不使用 with 语句，以便更好地控制异常处理流程
-            # 支持本地邮件服务和mailrise转发，自动检测SSL支持
-            server = smtplib.SMTP(smtp_server, smtp_port, timeout=30)
-            
-            # 自动检测是否支持STARTTLS
-            use_starttls = False
-            try:
-                # 先尝试使用STARTTLS（适用于QQ邮箱等标准SMTP服务）
-                server.starttls()
-                use_starttls = True
-                logger.info("STARTTLS连接成功")
-            except smtplib.SMTPNotSupportedError:
-                # 如果服务器不支持STARTTLS（如本地mailrise），继续使用明文连接
-                logger.info("服务器不支持STARTTLS，使用明文连接")
-            except Exception as e:
-                # 如果STARTTLS失败，尝试明文连接
-                logger.warning(f"STARTTLS失败，尝试明文连接: {str(e)}")
-            
-            # 智能认证：先尝试认证，失败则判断是否需要认证
-            try:
-                # 直接尝试登录认证（适用于大部分标准SMTP服务器）
-                server.login(sender_email, sender_password)
-                logger.info("身份认证成功")
-                
-            except smtplib.SMTPNotSupportedError:
-                # 服务器明确不支持认证
-                logger.info("服务器不支持身份认证，跳过认证步骤")
-                
-            except smtplib.SMTPAuthenticationError as e:
-                # 认证失败，可能是凭据错误或其他问题
-                logger.error(f"身份认证失败: {str(e)}")
-                raise Exception(f"身份认证失败: {str(e)}")
-                
-            except Exception as e:
-                # 检查是否是"需要认证"的错误
-                error_str = str(e).lower()
-                if any(keyword in error_str for keyword in ['auth', 'authentication', 'login', 'need ehlo']):
-                    # 明确要求认证的错误，不应该跳过
-                    logger.error(f"服务器要求身份认证但认证失败: {str(e)}")
-                    raise Exception(f"服务器要求身份认证: {str(e)}")
-                else:
-                    # 其他类型错误，可能是不需要认证的服务器
-                    logger.warning(f"认证过程出错，尝试无认证方式: {str(e)}")
-            
-            server.send_message(message)
-            email_sent = True  # 标记邮件已成功发送
-            
-            # 邮件发送成功后立即关闭连接
-            server.quit()
-            
+            _smtp_pool.send(smtp_server, smtp_port, sender_email, sender_password, message)
         except smtplib.SMTPException as e:
             raise Exception(f"SMTP错误: {str(e)}")
         except TimeoutError:
             raise Exception("SMTP服务器连接超时")
-        except Exception as e:
-            # 如果发生任何异常，尝试安全关闭连接
-            if server:
-                try:
-                    server.quit()
-                except:
-                    # 忽略关闭连接时的任何异常，因为主要异常更重要
-                    pass
-            raise e
 
-        # 如果执行到这里，说明邮件发送成功且连接正常关闭
+        # 如果执行到这里，说明邮件发送成功
         logger.info(f"邮件发送成功: {subject}")
         return {"status": "success", "message": "邮件发送成功"}
 
@@ -191,6 +303,24 @@ async def send_email(subject: str, content: Optional[str] = None, to_email: Opti
 
         return {"status": "error", "message": error_msg}
 
+
+async def send_email(subject: str, content: Optional[str] = None, to_email: Optional[str] = None) -> Dict:
+    """
+    发送邮件
+
+    实际的发送过程全部是阻塞I/O，放到线程中执行，避免阻塞事件循环
+
+    Args:
+        subject: 邮件主题
+        content: 邮件内容，如果为None则发送当天的任务执行日志
+        to_email: 收件人邮箱，如果为None则使用配置文件中的默认收件人
+
+    Returns:
+        dict: 发送结果，包含status和message
+    """
+    return await asyncio.to_thread(_send_email_sync, subject, content, to_email)
+
+
 def get_today_logs():
     """
     获取今日全部日志内容
@@ -213,8 +343,6 @@ def get_today_logs():
 
 # 测试代码
 if __name__ == '__main__':
-    import asyncio
-
     async def test_send():
         try:
             await send_email(
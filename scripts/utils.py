@@ -1,14 +1,64 @@
+import atexit
+import copy
 import os
 import sqlite3
 import sys
+import threading
 from datetime import datetime
-from typing import Dict, Any
+from itertools import islice
+from typing import Dict, Any, Tuple
 
 import yaml
 from loguru import logger
 
+# 优先使用基于LibYAML的C加载器，未编译LibYAML时回退到纯Python实现
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
 # 全局变量，用于标记日志系统是否已初始化
 _logger_initialized = False
+# 保证多个线程同时调用 setup_logger 时只初始化一次
+_logger_init_lock = threading.Lock()
+
+# 日志文件根目录
+LOG_ROOT_DIR = 'output/logs'
+
+# 只有以这些前缀开头的信息才输出到控制台
+_CONSOLE_PREFIXES = ("===", "正在", "已", "成功", "错误:", "警告:")
+
+def _console_filter(record) -> bool:
+    """控制台处理器的过滤条件，每条日志都会调用"""
+    message = record["message"]
+    return type(message) is str and message.startswith(_CONSOLE_PREFIXES)
+
+# 当天日志路径信息缓存：(日期序号, 路径信息字典)，跨天时重新生成
+_log_paths_cache = None
+
+def _get_log_paths() -> Dict:
+    """获取当天的日志目录和文件路径，同一天内只构建一次并确保目录存在"""
+    global _log_paths_cache
+
+    now = datetime.now()
+    date_key = now.toordinal()
+    if _log_paths_cache is not None and _log_paths_cache[0] == date_key:
+        return dict(_log_paths_cache[1])
+
+    year_month = f"{now.year}/{now.month:02d}"  # 年/月 部分
+    day_only = f"{now.day:02d}"  # 只取日期中的"日"部分
+    log_dir = f'{LOG_ROOT_DIR}/{year_month}/{day_only}'
+
+    # 确保当天日志目录存在
+    os.makedirs(log_dir, exist_ok=True)
+
+    paths = {
+        "log_dir": log_dir,
+        "main_log_file": f'{log_dir}/{day_only}.log',
+        "error_log_file": f'{log_dir}/error_{day_only}.log'
+    }
+    _log_paths_cache = (date_key, paths)
+    return dict(paths)
 
 def setup_logger(log_level: str = "INFO") -> Dict:
     """
@@ -20,27 +70,24 @@ def setup_logger(log_level: str = "INFO") -> Dict:
     Returns:
         包含日志路径信息的字典
     """
-    global _logger_initialized
+    # 如果日志系统已初始化，直接返回当前日志路径（同一天内直接使用缓存）
+    if _logger_initialized:
+        return _get_log_paths()
 
-    # 获取当前日志文件路径
-    current_date = datetime.now().strftime("%Y/%m/%d")
-    year_month = current_date.rsplit("/", 1)[0]  # 年/月 部分
-    day_only = current_date.split('/')[-1]  # 只取日期中的"日"部分
-    log_dir = f'output/logs/{year_month}/{day_only}'
-    
-    # 确保初始日志目录存在
-    os.makedirs(log_dir, exist_ok=True)
+    with _logger_init_lock:
+        # 加锁后再检查一次，避免并发调用重复添加处理器
+        if _logger_initialized:
+            return _get_log_paths()
+        _init_logger(log_level)
 
-    # 如果日志系统已初始化，直接返回
-    if _logger_initialized:
-        main_log_file = f'{log_dir}/{day_only}.log'
-        error_log_file = f'{log_dir}/error_{day_only}.log'
+    # 记录一条启动日志，测试日志系统
+    logger.info("=== 日志系统初始化完成 ===")
 
-        return {
-            "log_dir": log_dir,
-            "main_log_file": main_log_file,
-            "error_log_file": error_log_file
-        }
+    return _get_log_paths()
+
+def _init_logger(log_level: str) -> None:
+    """移除默认处理器并添加控制台和文件处理器，调用方需持有 _logger_init_lock"""
+    global _logger_initialized
 
     # 移除默认处理器
     logger.remove()
@@ -49,16 +96,12 @@ def setup_logger(log_level: str = "INFO") -> Dict:
     logger.configure(extra={"app_name": "BilibiliHistoryFetcher", "version": "1.0.0"})
 
     # 添加控制台处理器（仅INFO级别以上，只显示消息，无时间戳等）
+    # 通过过滤条件的记录很少，直接同步写入stdout
     logger.add(
         sys.stdout,
         level="INFO",
         format="<green>{message}</green>",
-        filter=lambda record: (
-            # 只有以特定字符开头的信息才输出到控制台
-            isinstance(record["message"], str) and
-            record["message"].startswith(("===", "正在", "已", "成功", "错误:", "警告:"))
-        ),
-        enqueue=True,  # 确保控制台输出也是进程安全的
+        filter=_console_filter,
         diagnose=False  # 禁用诊断以避免日志循环
     )
 
@@ -66,15 +109,16 @@ def setup_logger(log_level: str = "INFO") -> Dict:
     # {time:YYYY} - 年份目录
     # {time:MM} - 月份目录
     # {time:DD} - 日期目录和文件名
-    dynamic_log_path = "output/logs/{time:YYYY}/{time:MM}/{time:DD}/{time:DD}.log"
-    
+    dynamic_log_path = LOG_ROOT_DIR + "/{time:YYYY}/{time:MM}/{time:DD}/{time:DD}.log"
+
     # 添加文件处理器（完整日志信息）
+    # 不使用 enqueue：loguru 的文件sink本身由锁保证线程安全，省去每条记录经过队列时的pickle开销
     logger.add(
         dynamic_log_path,  # 使用动态路径
         level=log_level,
         format="[{time:YYYY-MM-DD HH:mm:ss}] [{level}] [{extra[app_name]}] [v{extra[version]}] [进程:{process}] [线程:{thread}] [{name}] [{file.name}:{line}] [{function}] {message}\n{exception}",
         encoding="utf-8",
-        enqueue=True,  # 启用进程安全的队列
+        enqueue=False,
         diagnose=False,  # 禁用诊断信息，避免不必要的栈跟踪导致的死锁
         backtrace=False,  # 禁用异常回溯，避免不必要的栈跟踪
         rotation="00:00",  # 每天午夜轮转
@@ -83,15 +127,15 @@ def setup_logger(log_level: str = "INFO") -> Dict:
     )
 
     # 错误日志也使用动态路径
-    dynamic_error_log_path = "output/logs/{time:YYYY}/{time:MM}/{time:DD}/error_{time:DD}.log"
-    
+    dynamic_error_log_path = LOG_ROOT_DIR + "/{time:YYYY}/{time:MM}/{time:DD}/error_{time:DD}.log"
+
     # 专门用于记录错误级别日志的处理器
     logger.add(
         dynamic_error_log_path,  # 使用动态路径
         level="ERROR",  # 只记录ERROR及以上级别
         format="[{time:YYYY-MM-DD HH:mm:ss}] [{level}] [{extra[app_name]}] [{name}] [{file.name}:{line}] [{function}] {message}\n{exception}",
         encoding="utf-8",
-        enqueue=True,
+        enqueue=False,
         diagnose=False,  # 禁用诊断信息
         backtrace=False,  # 禁用异常回溯
         rotation="00:00",  # 每天午夜轮转
@@ -102,30 +146,28 @@ def setup_logger(log_level: str = "INFO") -> Dict:
     # 标记日志系统已初始化
     _logger_initialized = True
 
-    # 记录一条启动日志，测试日志系统
-    logger.info("=== 日志系统初始化完成 ===")
-
-    main_log_file = f'{log_dir}/{day_only}.log'
-    error_log_file = f'{log_dir}/error_{day_only}.log'
-
-    return {
-        "log_dir": log_dir,
-        "main_log_file": main_log_file,
-        "error_log_file": error_log_file
-    }
-
 # 初始化日志系统
 setup_logger()
 
 
+# 是否为打包后的exe运行，以及由此确定的项目基础路径和配置目录，运行期间不会变化
+_FROZEN = getattr(sys, 'frozen', False)
+if _FROZEN:
+    # 如果是打包后的exe运行，基础路径为exe所在目录，配置文件在_internal/config目录中
+    _BASE_PATH = os.path.dirname(sys.executable)
+    _CONFIG_DIR = os.path.join(_BASE_PATH, '_internal', 'config')
+else:
+    # 如果是直接运行python脚本
+    _BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    _CONFIG_DIR = os.path.join(_BASE_PATH, 'config')
+
+# 基础输出目录和数据库目录
+_OUTPUT_DIR = os.path.join(_BASE_PATH, 'output')
+_DATABASE_DIR = os.path.join(_OUTPUT_DIR, 'database')
+
 def get_base_path() -> str:
     """获取项目基础路径"""
-    if getattr(sys, 'frozen', False):
-        # 如果是打包后的exe运行，返回exe所在目录
-        return os.path.dirname(sys.executable)
-    else:
-        # 如果是直接运行python脚本
-        return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return _BASE_PATH
 
 def get_config_path(config_file: str) -> str:
     """
@@ -135,33 +177,56 @@ def get_config_path(config_file: str) -> str:
     Returns:
         配置文件的完整路径
     """
-    if getattr(sys, 'frozen', False):
-        # 如果是打包后的exe运行，配置文件在_internal/config目录中
-        base_path = os.path.dirname(sys.executable)
-        return os.path.join(base_path, '_internal', 'config', config_file)
-    else:
-        # 如果是直接运行python脚本
-        base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        return os.path.join(base_path, 'config', config_file)
+    return os.path.join(_CONFIG_DIR, config_file)
+
+# 调试输出中列出目录内容时最多显示的条目数
+DEBUG_DIR_LIST_LIMIT = 50
+
+def _list_dir_names(path: str, limit: int = DEBUG_DIR_LIST_LIMIT) -> list:
+    """列出目录下的前 limit 个条目名称，用于调试日志"""
+    try:
+        with os.scandir(path) as entries:
+            return [entry.name for entry in islice(entries, limit)]
+    except OSError as e:
+        return [f"<无法读取目录: {e}>"]
+
+# 已解析的配置缓存：配置文件路径 -> ((修改时间, 文件大小), 配置字典)
+_CONFIG_CACHE: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
 
 def load_config() -> Dict[str, Any]:
-    """加载配置文件并验证"""
+    """
+    加载配置文件并验证
+
+    解析结果按文件的修改时间和大小缓存，文件未变化时不再重新解析YAML。
+    调用方可能会修改返回的字典，因此每次返回缓存的深拷贝。
+    """
     try:
         config_path = get_config_path('config.yaml')
-        if not os.path.exists(config_path):
+        try:
+            stat = os.stat(config_path)
+        except FileNotFoundError:
+            stat = None
+        if stat is not None:
+            file_key = (stat.st_mtime_ns, stat.st_size)
+            cached = _CONFIG_CACHE.get(config_path)
+            if cached is not None and cached[0] == file_key:
+                return copy.deepcopy(cached[1])
+        else:
             # 打印更多调试信息
             base_path = get_base_path()
             logger.debug(f"\n=== 配置文件信息 ===")
             logger.debug(f"当前基础路径: {base_path}")
             logger.debug(f"尝试加载配置文件: {config_path}")
-            logger.debug(f"当前目录内容: {os.listdir(base_path)}")
-            if os.path.exists(os.path.dirname(config_path)):
-                logger.debug(f"配置目录内容: {os.listdir(os.path.dirname(config_path))}")
+            # 目录列表只在DEBUG级别实际输出时才生成，且最多列出前若干项
+            logger.opt(lazy=True).debug("当前目录内容: {}", lambda: _list_dir_names(base_path))
+            config_dir = os.path.dirname(config_path)
+            if os.path.exists(config_dir):
+                logger.opt(lazy=True).debug("配置目录内容: {}", lambda: _list_dir_names(config_dir))
             logger.debug("=====================\n")
             raise FileNotFoundError(f"配置文件不存在: {config_path}")
 
         with open(config_path, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
+            config = yaml.load(f, Loader=_YamlLoader)
 
         # 验证邮件配置
         email_config = config.get('email', {})
@@ -171,11 +236,23 @@ def load_config() -> Dict[str, Any]:
         if missing_fields:
             raise ValueError(f"邮件配置缺少必要字段: {', '.join(missing_fields)}")
 
+        # 只缓存验证通过的配置
+        _CONFIG_CACHE[config_path] = (file_key, copy.deepcopy(config))
         return config
     except Exception as e:
         logger.error(f"加载配置文件失败: {str(e)}")
         raise
 
+# 本进程中已确认存在的基础目录（output、output/database），这些目录运行期间不会被删除
+_created_base_dirs = set()
+
+def _ensure_base_dir(directory: str) -> None:
+    """创建基础目录，同一目录在进程内只调用一次 makedirs"""
+    if directory in _created_base_dirs:
+        return
+    os.makedirs(directory, exist_ok=True)
+    _created_base_dirs.add(directory)
+
 def get_output_path(*paths: str) -> str:
     """
     获取输出文件路径
@@ -184,21 +261,19 @@ def get_output_path(*paths: str) -> str:
     Returns:
         完整的输出路径
     """
-    # 总是使用exe所在目录（或项目根目录）作为基础路径
-    base_path = get_base_path()
+    # 总是使用exe所在目录（或项目根目录）下的 output 作为基础输出目录
+    output_dir = _OUTPUT_DIR
 
-    # 基础输出目录
-    output_dir = os.path.join(base_path, 'output')
-
-    # 创建基础输出目录
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
+    # 创建基础输出目录（每个进程只需创建一次）
+    _ensure_base_dir(output_dir)
 
     # 组合完整路径
     full_path = os.path.join(output_dir, *paths)
 
-    # 确保父目录存在
-    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    # 确保父目录存在；子目录可能在运行期间被清理，因此不做缓存
+    parent_dir = os.path.dirname(full_path)
+    if parent_dir != output_dir:
+        os.makedirs(parent_dir, exist_ok=True)
 
     return full_path
 
@@ -210,15 +285,11 @@ def get_database_path(*paths: str) -> str:
     Returns:
         完整的数据库路径
     """
-    # 总是使用exe所在目录（或项目根目录）作为基础路径
-    base_path = get_base_path()
+    # 总是使用exe所在目录（或项目根目录）下的 output/database 作为基础数据库目录
+    database_dir = _DATABASE_DIR
 
-    # 基础数据库目录
-    database_dir = os.path.join(base_path, 'output', 'database')
-
-    # 创建基础数据库目录
-    if not os.path.exists(database_dir):
-        os.makedirs(database_dir)
+    # 创建基础数据库目录（每个进程只需创建一次）
+    _ensure_base_dir(database_dir)
 
     # 组合完整路径
     full_path = os.path.join(database_dir, *paths)
@@ -234,24 +305,156 @@ def get_logs_path() -> str:
     """
     获取当前日期的日志文件路径
     
-    根据当前日期动态生成日志文件路径，与setup_logger函数中的动态路径格式保持一致
+    与setup_logger共用按天缓存的日志路径信息，同一天内不再重复构建路径和创建目录
     
     Returns:
         str: 当前日期对应的日志文件路径
     """
-    current_time = datetime.now()
-    year = str(current_time.year)
-    month = f"{current_time.month:02d}"
-    day = f"{current_time.day:02d}"
-    
-    # 构建与setup_logger中动态路径格式一致的路径
-    log_path = f"output/logs/{year}/{month}/{day}/{day}.log"
-    
-    # 确保日志目录存在
-    log_dir = os.path.dirname(log_path)
-    os.makedirs(log_dir, exist_ok=True)
-    
-    return log_path
+    return _get_log_paths()["main_log_file"]
+
+# 数据库连接池：每个数据库文件最多保留的空闲连接数及每个连接初始化时设置的默认 PRAGMA
+DB_POOL_MAX_IDLE = 4
+DB_POOL_PRAGMAS = (
+    ('cache_size', -65536),      # 64MB 页缓存
+    ('temp_store', 'MEMORY'),
+)
+
+class _PooledConnection(sqlite3.Connection):
+    """
+    close() 时归还到所属连接池而不是真正关闭的连接
+
+    归还前回滚未提交的事务并重置 row_factory、text_factory、isolation_level；
+    注册过自定义函数、回调等无法重置的状态的连接不再复用，直接关闭。
+    重复调用 close() 只有第一次生效，避免同一连接被放回池中两次。
+    """
+
+    def _init_pooled(self, pool) -> None:
+        self._pool = pool
+        self._returned = False
+        self._reusable = True
+
+    def _mark_not_reusable(self) -> None:
+        self._reusable = False
+
+    def create_function(self, *args, **kwargs):
+        self._mark_not_reusable()
+        return super().create_function(*args, **kwargs)
+
+    def create_aggregate(self, *args, **kwargs):
+        self._mark_not_reusable()
+        return super().create_aggregate(*args, **kwargs)
+
+    def create_collation(self, *args, **kwargs):
+        self._mark_not_reusable()
+        return super().create_collation(*args, **kwargs)
+
+    def set_authorizer(self, *args, **kwargs):
+        self._mark_not_reusable()
+        return super().set_authorizer(*args, **kwargs)
+
+    def set_progress_handler(self, *args, **kwargs):
+        self._mark_not_reusable()
+        return super().set_progress_handler(*args, **kwargs)
+
+    def set_trace_callback(self, *args, **kwargs):
+        self._mark_not_reusable()
+        return super().set_trace_callback(*args, **kwargs)
+
+    def close(self):
+        if self._returned:
+            return
+        self._returned = True
+        try:
+            # 丢弃未提交的事务，并恢复调用方可能修改过的连接属性
+            self.rollback()
+            self.row_factory = None
+            self.text_factory = str
+            self.isolation_level = ''
+        except sqlite3.Error:
+            super().close()
+            return
+        if not (self._reusable and self._pool.release(self)):
+            super().close()
+
+
+class _SQLitePool:
+    """单个数据库文件的连接池"""
+
+    def __init__(self, db_path: str, pragmas: tuple):
+        self.db_path = db_path
+        self.pragmas = pragmas
+        self._lock = threading.Lock()
+        self._idle = []
+
+    def acquire(self) -> _PooledConnection:
+        if not os.path.exists(self.db_path):
+            # 数据库文件已被删除，池中的连接都已失效
+            self.close_all()
+        else:
+            with self._lock:
+                if self._idle:
+                    conn = self._idle.pop()
+                    conn._returned = False
+                    return conn
+
+        conn = sqlite3.connect(self.db_path, factory=_PooledConnection, check_same_thread=False)
+        conn._init_pooled(self)
+        for pragma, value in self.pragmas:
+            conn.execute(f'PRAGMA {pragma}={value}')
+        return conn
+
+    def release(self, conn: _PooledConnection) -> bool:
+        """放回空闲连接，池已满时返回False，由调用方真正关闭"""
+        with self._lock:
+            if len(self._idle) < DB_POOL_MAX_IDLE:
+                self._idle.append(conn)
+                return True
+        return False
+
+    def close_all(self) -> None:
+        with self._lock:
+            connections = list(self._idle)
+            self._idle.clear()
+        for conn in connections:
+            try:
+                sqlite3.Connection.close(conn)
+            except sqlite3.Error:
+                pass
+
+
+# 数据库文件路径 -> 连接池
+_db_pools: Dict[str, _SQLitePool] = {}
+_db_pools_lock = threading.Lock()
+
+def get_pooled_connection(db_path: str, pragmas: tuple = DB_POOL_PRAGMAS) -> sqlite3.Connection:
+    """
+    从指定数据库文件的连接池中获取连接，调用方照常 close() 即可归还
+
+    Args:
+        db_path: 数据库文件路径
+        pragmas: 新建连接时设置的 PRAGMA，同一数据库文件以第一次调用时传入的为准
+    Returns:
+        数据库连接
+    """
+    pool = _db_pools.get(db_path)
+    if pool is None:
+        with _db_pools_lock:
+            pool = _db_pools.setdefault(db_path, _SQLitePool(db_path, pragmas))
+    return pool.acquire()
+
+def close_db_pool(db_path: str = None) -> None:
+    """真正关闭连接池中的空闲连接（删除或替换数据库文件前、进程退出时调用）
+
+    Args:
+        db_path: 只关闭该数据库文件的连接池，不传则关闭所有连接池
+    """
+    with _db_pools_lock:
+        pools = list(_db_pools.values()) if db_path is None else [_db_pools.get(db_path)]
+    for pool in pools:
+        if pool is not None:
+            pool.close_all()
+
+atexit.register(close_db_pool)
 
 def get_db():
     """获取数据库连接"""
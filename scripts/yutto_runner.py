@@ -1,57 +1,121 @@
 import asyncio
 import io
 import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import AsyncGenerator
 
+from loguru import logger
 from yutto.__main__ import main as _YUTTO_MAIN
 
-class _AsyncWriter(io.StringIO):
-    """自定义的 StringIO：每次 write 时立即通过 Queue 推送到事件循环"""
-    def __init__(self, queue: asyncio.Queue[str | None], loop: asyncio.AbstractEventLoop):
-        super().__init__()
-        self._queue = queue
+class _AsyncWriter(io.TextIOBase):
+    """只写的文本流：write 的内容直接追加到 deque，再通过 Event 唤醒事件循环中的消费者
+
+    不继承 StringIO，避免维护一份永远不会被读取的内存缓冲区
+    """
+    encoding = 'utf-8'
+
+    def __init__(self, buf: deque[str | None], event: asyncio.Event, loop: asyncio.AbstractEventLoop):
+        self._buf = buf
+        self._event = event
         self._loop = loop
+        self._notify_pending = False
+        self._detached = False
+
+    def detach_consumer(self) -> None:
+        """消费者已停止读取：之后的输出直接丢弃，避免在 yutto 继续运行期间无限堆积"""
+        self._detached = True
+        self._buf.clear()
 
     def write(self, s: str) -> int:
-        """重写 write，每写一次就把内容丢到 Queue"""
-        if s:
-            self._loop.call_soon_threadsafe(self._queue.put_nowait, s)
+        """重写 write：deque.append 本身线程安全，只有没有待处理的唤醒时才调度一次 Event.set"""
+        if s and not self._detached:
+            self._buf.append(s)
+            if not self._notify_pending:
+                self._notify_pending = True
+                self._loop.call_soon_threadsafe(self._notify)
         return len(s)
 
+    def writable(self) -> bool:
+        return True
+
+    def _notify(self) -> None:
+        """在事件循环中执行：先清除标记再 set，保证之后追加的内容一定会再触发一次唤醒"""
+        self._notify_pending = False
+        self._event.set()
+
+
+# sys.stdout / sys.stderr / sys.argv 都是进程级全局状态，同一时间只允许一个 yutto 运行
+_RUN_LOCK = asyncio.Lock()
+
+# yutto 专用线程池：一次下载可能持续数小时，不占用事件循环默认线程池的工作线程。
+# 同一时间只有一次运行（由 _RUN_LOCK 保证，锁在 yutto 线程结束后才释放），因此一个工作线程即可
+_YUTTO_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="yutto")
+
 
 async def run_yutto(argv: list[str]) -> AsyncGenerator[str, None]:
     """在当前进程内执行 yutto CLI，实时产出 SSE 数据"""
+    await _RUN_LOCK.acquire()
     loop = asyncio.get_running_loop()
-    queue: asyncio.Queue[str | None] = asyncio.Queue()
+    buf: deque[str | None] = deque()
+    event = asyncio.Event()
 
     # 临时接管 stdout / stderr
     stdout_backup, stderr_backup = sys.stdout, sys.stderr
-    sys.stdout = _AsyncWriter(queue, loop)
-    sys.stderr = _AsyncWriter(queue, loop)
-
-    # 在线程池执行同步的 yutto.main
-    def _worker():
-        # 伪装 sys.argv
-        argv_backup = sys.argv
-        sys.argv = ["yutto", *argv, '--no-color']
-        try:
-            _YUTTO_MAIN()                   # 进入 yutto 的主函数
-        except SystemExit:                  # yutto 内部可能调用 sys.exit()
-            pass
-        finally:
-            sys.argv = argv_backup
-            # 通知协程：任务结束
-            loop.call_soon_threadsafe(queue.put_nowait, None)
-
-    # 把 _worker 丢进默认线程池，避免阻塞事件循环
-    loop.run_in_executor(None, _worker)
-
-    # 异步迭代 queue，并包装成 SSE
-    while True:
-        line = await queue.get()
-        if line is None:                    # 收到结束标记
-            break
-        yield f"data: {line.rstrip()}\n\n"
-
-    # 恢复 stdout / stderr
-    sys.stdout, sys.stderr = stdout_backup, stderr_backup
+    writers = (_AsyncWriter(buf, event, loop), _AsyncWriter(buf, event, loop))
+    sys.stdout, sys.stderr = writers
+
+    def _restore(future=None) -> None:
+        """恢复 stdout / stderr 并释放运行锁，必须在 yutto 线程结束后调用"""
+        sys.stdout, sys.stderr = stdout_backup, stderr_backup
+        _RUN_LOCK.release()
+        if future is not None and not future.cancelled() and future.exception() is not None:
+            logger.error(f"yutto 执行出错: {future.exception()}")
+
+    future = None
+    finished = False
+    try:
+        # 在线程池执行同步的 yutto.main
+        def _worker():
+            # 伪装 sys.argv
+            argv_backup = sys.argv
+            sys.argv = ["yutto", *argv, '--no-color']
+            try:
+                _YUTTO_MAIN()                   # 进入 yutto 的主函数
+            except SystemExit:                  # yutto 内部可能调用 sys.exit()
+                pass
+            finally:
+                sys.argv = argv_backup
+                # 通知协程：任务结束
+                buf.append(None)
+                loop.call_soon_threadsafe(event.set)
+
+        # 把 _worker 丢进 yutto 专用线程池，避免阻塞事件循环
+        future = loop.run_in_executor(_YUTTO_EXECUTOR, _worker)
+
+        # 每次被唤醒后把 deque 中积累的内容全部取出，并包装成 SSE
+        while not finished:
+            await event.wait()
+            event.clear()
+            while buf:
+                line = buf.popleft()
+                if line is None:                # 收到结束标记
+                    finished = True
+                    break
+                yield f"data: {line.rstrip()}\n\n"
+    finally:
+        # 消费者中途断开时 yutto 线程仍在运行：必须等它真正结束后才能恢复 stdout / stderr 并释放锁，
+        # 否则它剩余的输出会被下一次 run_yutto 的 _AsyncWriter 捕获。
+        # 这里不阻塞等待（下载可能还要持续数小时），由线程结束时的回调负责恢复，期间的输出直接丢弃
+        if not finished:
+            for writer in writers:
+                writer.detach_consumer()
+        if future is None:
+            _restore()
+        elif future.done():
+            _restore(future)
+        else:
+            future.add_done_callback(_restore)
+            if finished:
+                # 正常结束时线程已发出结束标记、即将退出，稍等片刻使返回前 stdout 已恢复
+                await asyncio.wait((future,))